@@ -15,8 +15,33 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 
+import collections
+import copy
+import hashlib
+import logging
+import multiprocessing
+import os
 import re
+import sys
+import xml.etree.ElementTree as ET
 import genapixml as CApi
+import diagnostics
+import metadoc
+import profiling
+from six.moves import cPickle as pickle
+
+
+logger = diagnostics.get_logger('abstractapi')
+
+if hasattr(sys, 'intern'):
+	_intern = sys.intern
+else:
+	_intern = intern
+
+
+def intern_name(name):
+	# intern() only accepts byte strings with Python 2
+	return _intern(name) if type(name) is str else name
 
 
 class Error(RuntimeError):
@@ -28,13 +53,66 @@ class BlacklistedException(Error):
 
 
 class Name(object):
+	__slots__ = ('_words', '_prev', '_version', '_conversions', '_conversionsVersion')
+	
 	camelCaseParsingRegex = re.compile('[A-Z][a-z0-9]*')
 	lowerCamelCaseSplitingRegex = re.compile('([a-z][a-z0-9]*)([A-Z][a-z0-9]*)')
 	
+	# A name gets a new version, greater than all the versions given before,
+	# each time its words or its parent change. So the greatest version along
+	# the chain of parents of a name only changes when its conversions do.
+	_lastVersion = 0
+	
 	def __init__(self):
+		self._conversions = None
+		self._conversionsVersion = None
 		self.words = []
 		self.prev = None
 	
+	def _new_version(self):
+		Name._lastVersion += 1
+		self._version = Name._lastVersion
+	
+	def _get_words(self):
+		return self._words
+	
+	def _set_words(self, words):
+		self._words = words
+		Name._new_version(self)
+	
+	def _get_prev(self):
+		return self._prev
+	
+	def _set_prev(self, prev):
+		self._prev = prev
+		Name._new_version(self)
+	
+	# The words must not be modified in place, assign a new list instead
+	words = property(fget=_get_words, fset=_set_words)
+	prev = property(fget=_get_prev, fset=_set_prev)
+	
+	def _get_conversions(self):
+		version = self._version
+		it = self._prev
+		while it is not None:
+			if it._version > version:
+				version = it._version
+			it = it._prev
+		if self._conversionsVersion != version:
+			self._conversions = {}
+			self._conversionsVersion = version
+		return self._conversions
+	
+	# The cached conversions are not pickled, they would be wrong in another process
+	def __getstate__(self):
+		return (self._words, self._prev)
+	
+	def __setstate__(self, state):
+		self._words, self._prev = state
+		Name._new_version(self)
+		self._conversions = None
+		self._conversionsVersion = None
+	
 	def copy(self):
 		nameType = type(self)
 		name = nameType()
@@ -67,10 +145,7 @@ class Name(object):
 				self.words = self.words[i:]
 	
 	def _lower_all_words(self):
-		i = 0
-		while i<len(self.words):
-			self.words[i] = self.words[i].lower()
-			i += 1
+		self.words = [word.lower() for word in self.words]
 	
 	def from_snake_case(self, name, namespace=None):
 		self.words = name.split('_')
@@ -81,14 +156,23 @@ class Name(object):
 			self.words = Name.camelCaseParsingRegex.findall(name)
 		else:
 			match = Name.lowerCamelCaseSplitingRegex.match(name)
-			self.words = [match.group(1)]
-			self.words += Name.camelCaseParsingRegex.findall(match.group(2))
+			self.words = [match.group(1)] + Name.camelCaseParsingRegex.findall(match.group(2))
 		
 		Name._lower_all_words(self)
 		Name._set_namespace(self, namespace)
 	
 	def to_snake_case(self, fullName=False, upper=False):
-		if self.prev is None or not fullName:
+		fullName = fullName and self.prev is not None
+		conversions = Name._get_conversions(self)
+		key = ('snake', fullName, upper)
+		res = conversions.get(key)
+		if res is None:
+			res = intern_name(Name._to_snake_case(self, fullName, upper))
+			conversions[key] = res
+		return res
+	
+	def _to_snake_case(self, fullName, upper):
+		if not fullName:
 			res = '_'.join(self.words)
 			if upper:
 				res = res.upper()
@@ -97,7 +181,17 @@ class Name(object):
 			return Name.to_snake_case(self.prev, fullName=True, upper=upper) + '_' + Name.to_snake_case(self, upper=upper)
 	
 	def to_camel_case(self, lower=False, fullName=False):
-		if self.prev is None or not fullName:
+		fullName = fullName and self.prev is not None
+		conversions = Name._get_conversions(self)
+		key = ('camel', fullName, lower)
+		res = conversions.get(key)
+		if res is None:
+			res = intern_name(Name._to_camel_case(self, lower, fullName))
+			conversions[key] = res
+		return res
+	
+	def _to_camel_case(self, lower, fullName):
+		if not fullName:
 			res = ''
 			for elem in self.words:
 				if elem is self.words[0] and lower:
@@ -109,7 +203,17 @@ class Name(object):
 			return Name.to_camel_case(self.prev, fullName=True, lower=lower) + Name.to_camel_case(self)
 	
 	def concatenate(self, upper=False, fullName=False):
-		if self.prev is None or not fullName:
+		fullName = fullName and self.prev is not None
+		conversions = Name._get_conversions(self)
+		key = ('concatenate', fullName, upper)
+		res = conversions.get(key)
+		if res is None:
+			res = intern_name(Name._concatenate(self, upper, fullName))
+			conversions[key] = res
+		return res
+	
+	def _concatenate(self, upper, fullName):
+		if not fullName:
 			res = ''
 			for elem in self.words:
 				if upper:
@@ -141,36 +245,50 @@ class Name(object):
 
 
 class ClassName(Name):
+	__slots__ = ()
+	
 	def to_c(self):
 		return Name.to_camel_case(self, fullName=True)
 
 
 class InterfaceName(ClassName):
+	__slots__ = ()
+	
 	def to_c(self):
 		return ClassName.to_c(self)[:-8] + 'Cbs'
 
 
 class EnumName(ClassName):
-	pass
+	__slots__ = ()
 
 
 class EnumValueName(ClassName):
-	pass
+	__slots__ = ()
 
 
 class MethodName(Name):
+	__slots__ = ('overloadRef',)
+	
 	regex = re.compile('^\d+$')
 	
 	def __init__(self):
+		Name.__init__(self)
 		self.overloadRef = 0
 	
+	def __getstate__(self):
+		return (Name.__getstate__(self), self.overloadRef)
+	
+	def __setstate__(self, state):
+		Name.__setstate__(self, state[0])
+		self.overloadRef = state[1]
+	
 	def from_snake_case(self, name, namespace=None):
 		Name.from_snake_case(self, name, namespace=namespace)
 		if len(self.words) > 0:
 			suffix = self.words[-1]
 			if MethodName.regex.match(suffix) is not None:
 				self.overloadRef = int(suffix)
-				del self.words[-1]
+				self.words = self.words[:-1]
 	
 	def to_c(self):
 		suffix = ('_' + str(self.overloadRef)) if self.overloadRef > 0 else ''
@@ -178,15 +296,19 @@ class MethodName(Name):
 
 
 class ArgName(Name):
+	__slots__ = ()
+	
 	def to_c(self):
 		return self.to_snake_case()
 
 
 class PropertyName(ArgName):
-	pass
+	__slots__ = ()
 
 
 class NamespaceName(Name):
+	__slots__ = ()
+	
 	def __init__(self, *params):
 		Name.__init__(self)
 		if len(params) > 0:
@@ -194,6 +316,8 @@ class NamespaceName(Name):
 
 
 class Object(object):
+	__slots__ = ('name', 'parent', 'deprecated')
+	
 	def __init__(self, name):
 		self.name = name
 		self.parent = None
@@ -207,6 +331,8 @@ class Object(object):
 
 
 class Type(Object):
+	__slots__ = ('isconst', 'isref', 'cname')
+	
 	def __init__(self, name, isconst=False, isref=False):
 		Object.__init__(self, name)
 		self.isconst = isconst
@@ -215,6 +341,8 @@ class Type(Object):
 
 
 class BaseType(Type):
+	__slots__ = ('size', 'isUnsigned')
+	
 	def __init__(self, name, isconst=False, isref=False, size=None, isUnsigned=False):
 		Type.__init__(self, name, isconst=isconst, isref=isref)
 		self.size = size
@@ -222,18 +350,24 @@ class BaseType(Type):
 
 
 class EnumType(Type):
+	__slots__ = ('desc',)
+	
 	def __init__(self, name, isconst=False, isref=False, enumDesc=None):
 		Type.__init__(self, name, isconst=isconst, isref=isref)
 		self.desc = enumDesc
 
 
 class ClassType(Type):
+	__slots__ = ('desc',)
+	
 	def __init__(self, name, isconst=False, isref=False, classDesc=None):
 		Type.__init__(self, name, isconst=isconst, isref=isref)
 		self.desc = classDesc
 
 
 class ListType(Type):
+	__slots__ = ('containedTypeName', '_containedTypeDesc')
+	
 	def __init__(self, containedTypeName, isconst=False, isref=False):
 		Type.__init__(self, 'list', isconst=isconst, isref=isref)
 		self.containedTypeName = containedTypeName
@@ -250,6 +384,8 @@ class ListType(Type):
 
 
 class DocumentableObject(Object):
+	__slots__ = ('briefDescription', 'detailedDescription')
+	
 	def __init__(self, name):
 		Object.__init__(self, name)
 		self.briefDescription = None
@@ -272,6 +408,8 @@ class DocumentableObject(Object):
 
 
 class Namespace(DocumentableObject):
+	__slots__ = ('children',)
+	
 	def __init__(self, name):
 		DocumentableObject.__init__(self, name)
 		self.children = []
@@ -281,12 +419,16 @@ class Namespace(DocumentableObject):
 		child.parent = self
 
 
-class Flag:
+class Flag(object):
+	__slots__ = ('position',)
+	
 	def __init__(self, position):
 		self.position = position
 
 
 class EnumValue(DocumentableObject):
+	__slots__ = ('value',)
+	
 	def __init__(self, name):
 		DocumentableObject.__init__(self, name)
 		self.value = None
@@ -300,6 +442,8 @@ class EnumValue(DocumentableObject):
 
 
 class Enum(DocumentableObject):
+	__slots__ = ('values',)
+	
 	def __init__(self, name):
 		DocumentableObject.__init__(self, name)
 		self.values = []
@@ -327,6 +471,8 @@ class Enum(DocumentableObject):
 
 
 class Argument(DocumentableObject):
+	__slots__ = ('_type', 'optional', 'default')
+	
 	def __init__(self, name, argType, optional=False, default=None):
 		DocumentableObject.__init__(self, name)
 		self._type = argType
@@ -345,6 +491,8 @@ class Argument(DocumentableObject):
 
 
 class Method(DocumentableObject):
+	__slots__ = ('type', 'constMethod', 'args', '_returnType')
+	
 	class Type:
 		Instance = 0,
 		Class = 1
@@ -371,6 +519,8 @@ class Method(DocumentableObject):
 
 
 class Property(DocumentableObject):
+	__slots__ = ('_setter', '_getter', '_type')
+	
 	def __init__(self, name):
 		DocumentableObject.__init__(self, name)
 		self._setter = None
@@ -398,6 +548,8 @@ class Property(DocumentableObject):
 
 
 class Class(DocumentableObject):
+	__slots__ = ('properties', 'instanceMethods', 'classMethods', '_listenerInterface', 'multilistener', 'refcountable')
+	
 	def __init__(self, name):
 		DocumentableObject.__init__(self, name)
 		self.properties = []
@@ -430,6 +582,8 @@ class Class(DocumentableObject):
 
 
 class Interface(DocumentableObject):
+	__slots__ = ('methods', '_listenedClass')
+	
 	def __init__(self, name):
 		DocumentableObject.__init__(self, name)
 		self.methods = []
@@ -445,6 +599,121 @@ class Interface(DocumentableObject):
 	listenedClass = property(fget=get_listened_class)
 
 
+# Result of the resolution of a C type, shared by all the types declared the same
+# way. The params are the keyword arguments of the constructor of the type.
+CTypeResolution = collections.namedtuple('CTypeResolution', ['kind', 'name', 'params'])
+
+
+# Fingerprints of the C objects: hashes of everything the parsing of a class or
+# an enum depends on, apart from the other classes and enums of the API
+def _doc_data(doc):
+	if doc is None:
+		return None
+	return [[(type(part).__name__, part.cname) if isinstance(part, metadoc.Reference) else part for part in paragraph.parts] for paragraph in doc.paragraphs]
+
+def _xml_data(node):
+	return None if node is None else ET.tostring(node)
+
+def _c_object_data(cObject):
+	return (cObject.name, cObject.deprecated, cObject.briefDescription, _xml_data(cObject.detailedDescription), _doc_data(cObject.briefDoc))
+
+def _c_argument_data(arg):
+	return (arg.name, arg.ctype, arg.completeType, arg.containedType, _xml_data(arg.description))
+
+def _c_function_data(function):
+	if function is None:
+		return None
+	return (_c_object_data(function), function.location, _c_argument_data(function.returnArgument), [_c_argument_data(arg) for arg in function.arguments])
+
+def _fingerprint(data):
+	return hashlib.sha1(repr(data).encode('utf-8')).hexdigest()
+
+def c_class_fingerprint(cclass):
+	data = (
+		_c_object_data(cclass),
+		cclass.cFunctionPrefix,
+		[_c_function_data(cclass.events[name]) for name in sorted(cclass.events)],
+		[_c_function_data(cclass.classMethods[name]) for name in sorted(cclass.classMethods)],
+		[_c_function_data(cclass.instanceMethods[name]) for name in sorted(cclass.instanceMethods)],
+		[(name, _c_function_data(cclass.properties[name].getter), _c_function_data(cclass.properties[name].setter)) for name in sorted(cclass.properties)]
+	)
+	return _fingerprint(data)
+
+def c_enum_fingerprint(cenum):
+	associatedTypedef = cenum.associatedTypedef.name if cenum.associatedTypedef is not None else None
+	return _fingerprint((_c_object_data(cenum), associatedTypedef, [(_c_object_data(value), value.value) for value in cenum.values]))
+
+def _files_digest(paths):
+	hasher = hashlib.sha1()
+	for path in paths:
+		with open(path, 'rb') as f:
+			hasher.update(hashlib.sha1(f.read()).digest())
+	return hasher.hexdigest()
+
+
+class ClassCache(object):
+	"""Results of the parsing of the classes by a previous run, keyed by the fingerprints of the C classes. The whole
+	cache is dropped when the context of the parsing changed."""
+	
+	version = 3
+	
+	def __init__(self, path, context):
+		self.path = path
+		self.context = context
+		self.classes = {}
+		self.hits = 0
+		self.misses = 0
+		self._payload = None
+	
+	def load(self):
+		try:
+			with open(self.path, 'rb') as f:
+				version, context, classes = pickle.load(f)
+		except Exception:
+			# Missing, truncated or unreadable caches are ignored
+			return
+		if version == ClassCache.version and context == self.context:
+			self.classes = classes
+	
+	def find(self, name, fingerprint):
+		entry = self.classes.get(name)
+		if entry is not None and entry[0] == fingerprint:
+			self.hits += 1
+			return entry[1]
+		self.misses += 1
+		return None
+	
+	# The classes are pickled now, before they are linked to the other ones,
+	# but only saved by save()
+	def update(self, classes):
+		self._payload = pickle.dumps((ClassCache.version, self.context, classes), pickle.HIGHEST_PROTOCOL)
+	
+	def save(self):
+		if self._payload is None:
+			return
+		directory = os.path.dirname(self.path)
+		if directory != '' and not os.path.isdir(directory):
+			os.makedirs(directory)
+		tmpPath = self.path + '.{0}.tmp'.format(os.getpid())
+		with open(tmpPath, 'wb') as f:
+			f.write(self._payload)
+		if os.path.exists(self.path):
+			os.remove(self.path)
+		os.rename(tmpPath, self.path)
+		self._payload = None
+
+
+# Names of the functions of a C class, in the order they are indexed by CParser
+def _class_function_names(cclass):
+	names = list(cclass.classMethods) + list(cclass.instanceMethods)
+	for _property in cclass.properties.values():
+		if _property.setter is not None:
+			names.append(_property.setter.name)
+		if _property.getter is not None:
+			names.append(_property.getter.name)
+	return names
+
+
 class CParser(object):
 	def __init__(self, cProject):
 		self.cBaseType = ['void', 'bool_t', 'char', 'short', 'int', 'long', 'size_t', 'time_t', 'float', 'double', 'LinphoneStatus']
@@ -463,6 +732,44 @@ class CParser(object):
 		self.forcedRefcountableClasses = ['LinphoneFactory']
 		
 		self.cProject = cProject
+		# Number of processes used to parse the classes
+		self.jobs = 1
+		# Names of the listeners to link to the parsed class, when parsing in a worker process
+		self._listenerLinks = None
+		# Resolutions of the C types, by C declaration
+		self._cTypes = {}
+		self._cBaseTypes = {}
+		# Methods parsed with types that could not be bound to their desc, which
+		# are the only ones left to _fix_all_types()
+		self._unboundTypeCount = 0
+		self._unboundMethods = set()
+		# Descriptions are not attached to the parsed objects if not set
+		self.docs = True
+		# Names of the objects referenced by the documentation but not found
+		self.unresolvedReferences = collections.OrderedDict()
+		# Classes, interfaces and enums referenced by each class or interface, and the other way round
+		self._dependencies = {}
+		self._dependents = {}
+		# Shared classes restricted by restricted(), by restricted class
+		self._originals = {}
+		# File where the results of the parsing of the classes are kept from
+		# one run to the next, so that only the modified classes are parsed
+		self.cacheFile = None
+		# Other files whose modification invalidates that cache, e.g. the code
+		# and the templates of the generator
+		self.cacheDependencies = []
+		# Cache whose update is saved by save_cache()
+		self._classCache = None
+		# Fingerprints of the C classes and enums, computed when there is a
+		# cache, see fingerprints()
+		self._classFingerprints = None
+		self._enumFingerprints = None
+		# C names of the classes, interfaces and enums which changed since the
+		# generation of the files being updated, the classes and interfaces
+		# being expanded to the ones referencing them. None if they are all
+		# considered changed, see compare_with_fingerprints().
+		self.affectedClasses = None
+		self.affectedEnums = None
 		
 		self.enumsIndex = {}
 		for enum in self.cProject.enums:
@@ -471,6 +778,14 @@ class CParser(object):
 			else:
 				self.enumsIndex[enum.associatedTypedef.name] = None
 		
+		self._init_class_indexes()
+		
+		name = NamespaceName()
+		name.from_snake_case('linphone')
+		
+		self.namespace = Namespace(name)
+	
+	def _init_class_indexes(self):
 		self.classesIndex = {}
 		self.interfacesIndex = {}
 		for _class in self.cProject.classes:
@@ -482,20 +797,8 @@ class CParser(object):
 		
 		self.methodsIndex = {}
 		for _class in self.cProject.classes:
-			for funcname in _class.classMethods:
-				self.methodsIndex[funcname] = None
-			for funcname in _class.instanceMethods:
+			for funcname in _class_function_names(_class):
 				self.methodsIndex[funcname] = None
-			for _property in _class.properties.values():
-				if _property.setter is not None:
-					self.methodsIndex[_property.setter.name] = None
-				if _property.getter is not None:
-					self.methodsIndex[_property.getter.name] = None
-		
-		name = NamespaceName()
-		name.from_snake_case('linphone')
-		
-		self.namespace = Namespace(name)
 	
 	def _is_blacklisted(self, name):
 		if type(name) is MethodName:
@@ -506,24 +809,191 @@ class CParser(object):
 			return False
 		
 	def parse_all(self):
-		for enum in self.cProject.enums:
-			try:
-				self.parse_enum(enum)
-			except Error as e:
-				print('Could not parse \'{0}\' enum: {1}'.format(enum.name, e.args[0]))
-		
-		for _class in self.cProject.classes:
-			try:
-				self.parse_class(_class)
-			except BlacklistedException:
-				pass
-			except Error as e:
-				print('Could not parse \'{0}\' class: {1}'.format(_class.name, e.args[0]))
+		with profiling.phase('abstract parsing'):
+			for enum in self.cProject.enums:
+				try:
+					self.parse_enum(enum)
+				except Error as e:
+					logger.error('Could not parse \'{0}\' enum: {1}'.format(enum.name, e.args[0]))
+			
+			if self.cacheFile is not None:
+				self._parse_classes_incrementally()
+			elif self.jobs > 1 and len(self.cProject.classes) > 1:
+				self._parse_classes_in_parallel()
+			else:
+				for cclass in self.cProject.classes:
+					_class = self._try_parse_class(cclass)
+					if _class is not None:
+						self._register_class(cclass, _class)
+			
+			self._clean_all_indexes()
+		with profiling.phase('type fixing'):
+			self._fix_all_types()
+		if self.docs:
+			with profiling.phase('doc resolution'):
+				self._fix_all_docs()
+		with profiling.phase('dependency indexing'):
+			self._index_all_dependencies()
+	
+	def _parse_classes_in_parallel(self):
+		results = self._parse_classes_in_workers(list(range(len(self.cProject.classes))))
+		self._merge_parsed_classes(results)
+	
+	def _parse_classes_in_workers(self, indexes):
+		# Do not let the workers inherit pending messages
+		diagnostics.flush()
+		verbose = logger.isEnabledFor(logging.DEBUG)
+		pool = multiprocessing.Pool(self.jobs, _init_parsing_worker, (self, verbose))
+		try:
+			return pool.map(_parse_class_in_worker, indexes, max(1, len(indexes) // (self.jobs * 4)))
+		finally:
+			pool.close()
+			pool.join()
+	
+	# Parse the classes as a worker process would, so that the results do not
+	# refer to the other classes and enums and can be saved
+	def _parse_classes_in_process(self, indexes):
+		enumsIndex = self.enumsIndex
+		methodsIndex = self.methodsIndex
+		unboundMethods = self._unboundMethods
+		results = []
+		try:
+			with diagnostics.recording(logger.isEnabledFor(logging.DEBUG)):
+				self._prepare_worker()
+				for index in indexes:
+					results.append(self._parse_class_in_worker(self.cProject.classes[index]))
+		finally:
+			self.enumsIndex = enumsIndex
+			self.methodsIndex = methodsIndex
+			self._unboundMethods = unboundMethods
+			self._listenerLinks = None
+		return results
+	
+	def _parse_classes_incrementally(self):
+		cache = ClassCache(self.cacheFile, self._cache_context())
+		cache.load()
+		fingerprints = [c_class_fingerprint(cclass) for cclass in self.cProject.classes]
+		results = [cache.find(cclass.name, fingerprint) for cclass, fingerprint in zip(self.cProject.classes, fingerprints)]
+		missing = [index for index, result in enumerate(results) if result is None]
+		if self.jobs > 1 and len(missing) > 1:
+			parsed = self._parse_classes_in_workers(missing)
+		else:
+			parsed = self._parse_classes_in_process(missing)
+		for index, result in zip(missing, parsed):
+			results[index] = result
 		
+		self._classFingerprints = {}
+		for cclass, fingerprint in zip(self.cProject.classes, fingerprints):
+			self._classFingerprints[cclass.name] = fingerprint
+		self._enumFingerprints = {}
+		for cenum in self.cProject.enums:
+			name = cenum.name if cenum.associatedTypedef is None else cenum.associatedTypedef.name
+			self._enumFingerprints[name] = c_enum_fingerprint(cenum)
+		logger.debug('{0} class(es) parsed again, {1} taken from the cache'.format(cache.misses, cache.hits))
 		
-		self._clean_all_indexes()
-		self._fix_all_types()
-		self._fix_all_docs()
+		# Pickled before the merge, which links the classes together
+		if len(missing) > 0:
+			classes = {}
+			for cclass, fingerprint, result in zip(self.cProject.classes, fingerprints, results):
+				classes[cclass.name] = (fingerprint, result)
+			cache.update(classes)
+			self._classCache = cache
+		self._merge_parsed_classes(results)
+	
+	# Save the parsing of the classes for the next runs. It is called once the
+	# files have been generated, so that a failed generation parses them again.
+	def save_cache(self):
+		if self._classCache is not None:
+			self._classCache.save()
+			self._classCache = None
+	
+	def _cache_context(self):
+		sources = [os.path.splitext(module.__file__)[0] + '.py' for module in [sys.modules[__name__], metadoc]]
+		context = (
+			ClassCache.version,
+			sys.version_info[0],
+			_files_digest(sources + self.cacheDependencies),
+			self.methodBl,
+			self.functionBl,
+			self.classBl,
+			self.forcedRefcountableClasses,
+			self.docs,
+			sorted(self.classesIndex.keys()),
+			sorted(self.interfacesIndex.keys()),
+			sorted(self.enumsIndex.keys())
+		)
+		return _fingerprint(context)
+	
+	# Fingerprints of the classes and enums the files are generated from, to
+	# be kept with them, or None if there is no cache. They also depend on the
+	# blacklists and on the code of the generator.
+	def fingerprints(self):
+		if self._classFingerprints is None:
+			return None
+		return {'context': self._cache_context(), 'classes': self._classFingerprints, 'enums': self._enumFingerprints}
+	
+	# Set the classes and enums which changed since the generation of the files
+	# whose fingerprints are given. All of them are considered changed if the
+	# fingerprints are unknown.
+	def compare_with_fingerprints(self, fingerprints):
+		self.affectedClasses = None
+		self.affectedEnums = None
+		if self._classFingerprints is None or fingerprints is None or fingerprints.get('context') != self._cache_context():
+			return
+		self.affectedClasses = set([name for name, fingerprint in self._classFingerprints.items() if fingerprints['classes'].get(name) != fingerprint])
+		self.affectedEnums = set([name for name, fingerprint in self._enumFingerprints.items() if fingerprints['enums'].get(name) != fingerprint])
+		self._expand_affected_classes()
+	
+	# A class is also affected by the changes of the classes and enums it
+	# references, and a listener by the ones of the class it listens to
+	def _expand_affected_classes(self):
+		# The types reference the shared classes, not the copies made by
+		# restricted(), so both are named
+		cNames = {}
+		for index in [self.classesIndex, self.interfacesIndex]:
+			for cname, _class in index.items():
+				cNames[_class] = cname
+				cNames[self._originals.get(_class, _class)] = cname
+		changed = [self.classesIndex.get(cname) or self.interfacesIndex.get(cname) for cname in self.affectedClasses]
+		changed += [self.enumsIndex.get(name) for name in self.affectedEnums]
+		for obj in changed:
+			if obj is None:
+				continue
+			obj = self._originals.get(obj, obj)
+			for dependent in self.dependents_of(obj):
+				self.affectedClasses.add(cNames[dependent])
+			if type(obj) is Class and obj.listenerInterface in cNames:
+				self.affectedClasses.add(cNames[obj.listenerInterface])
+	
+	def is_affected(self, cname):
+		return self.affectedClasses is None or cname in self.affectedClasses
+	
+	def _merge_parsed_classes(self, results):
+		# Merge in the order of the classes, as in a serial run. The listeners
+		# are linked only now, as the ones parsed by other workers were unknown.
+		for cclass, (_class, methods, listenerLinks, unboundMethods, records) in zip(self.cProject.classes, results):
+			diagnostics.replay(records)
+			for cname, method in methods:
+				self.methodsIndex[cname] = method
+			self._unboundMethods.update(unboundMethods)
+			if _class is not None:
+				_class.name.prev = self.namespace.name
+				for listenerName in listenerLinks:
+					_class.listenerInterface = self.interfacesIndex[listenerName]
+				self._register_class(cclass, _class)
+	
+	def _prepare_worker(self):
+		# Types are linked to the enums of the parent process by _fix_all_types()
+		self.enumsIndex = dict.fromkeys(self.enumsIndex)
+		self._listenerLinks = []
+	
+	def _parse_class_in_worker(self, cclass):
+		self.methodsIndex = collections.OrderedDict()
+		self._listenerLinks = []
+		# Pickled along with the class, so that they remain its methods
+		self._unboundMethods = set()
+		_class = self._try_parse_class(cclass)
+		return (_class, list(self.methodsIndex.items()), self._listenerLinks, list(self._unboundMethods), diagnostics.take_records())
 	
 	def _clean_all_indexes(self):
 		for index in [self.classesIndex, self.interfacesIndex, self.methodsIndex]:
@@ -554,11 +1024,14 @@ class CParser(object):
 			else:
 				self._fix_all_types_in_interface(_class)
 	
+	# Only the methods whose types were not all bound while parsing them are
+	# fixed, but in the order of the indexes, as the warnings are
 	def _fix_all_types(self):
 		for _class in self.interfacesIndex.values():
 			self._fix_all_types_in_class_or_interface(_class)
 		for _class in self.classesIndex.values():
 			self._fix_all_types_in_class_or_interface(_class)
+		self._unboundMethods = set()
 	
 	def _fix_all_types_in_class(self, _class):
 		for property in _class.properties:
@@ -575,12 +1048,14 @@ class CParser(object):
 			self._fix_all_types_in_method(method)
 	
 	def _fix_all_types_in_method(self, method):
+		if method not in self._unboundMethods:
+			return
 		try:
 			self._fix_type(method.returnType)
 			for arg in method.args:
 				self._fix_type(arg.type)
 		except Error as e:
-			print('warning: some types could not be fixed in {0}() function: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
+			logger.warning('warning: some types could not be fixed in {0}() function: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
 		
 	def _fix_type(self, _type):
 		if isinstance(_type, EnumType) and _type.desc is None:
@@ -603,13 +1078,132 @@ class CParser(object):
 				else:
 					raise Error('bctbx_list_t type without specified contained type')
 	
+	# The references are only resolved when the descriptions are translated
 	def _fix_all_docs(self):
 		for _class in self.classesIndex.values():
 			if _class.briefDescription is not None:
-				_class.briefDescription.resolve_all_references(self)
+				_class.briefDescription.api = self
 		for method in self.methodsIndex.values():
 			if method.briefDescription is not None:
-				method.briefDescription.resolve_all_references(self)
+				method.briefDescription.api = self
+	
+	def report_unresolved_references(self):
+		if len(self.unresolvedReferences) > 0:
+			logger.warning('{0} doc reference(s) pointing on unknown objects: {1}'.format(len(self.unresolvedReferences), ', '.join(self.unresolvedReferences.keys())))
+			self.unresolvedReferences.clear()
+	
+	def _index_all_dependencies(self):
+		self._dependencies = {}
+		self._dependents = {}
+		for _class in list(self.interfacesIndex.values()) + list(self.classesIndex.values()):
+			if _class is not None:
+				dependencies = self._find_dependencies(_class)
+				self._dependencies[_class] = dependencies
+				for dependency in dependencies:
+					self._dependents.setdefault(dependency, []).append(_class)
+	
+	def _find_dependencies(self, _class):
+		dependencies = collections.OrderedDict()
+		if type(_class) is Class:
+			methods = []
+			for property in _class.properties:
+				if property.setter is not None:
+					methods.append(property.setter)
+				if property.getter is not None:
+					methods.append(property.getter)
+			methods += _class.classMethods + _class.instanceMethods
+		else:
+			methods = _class.methods
+		
+		for method in methods:
+			self._add_type_dependencies(method.returnType, dependencies)
+			for arg in method.args:
+				self._add_type_dependencies(arg.type, dependencies)
+		
+		if type(_class) is Class and _class.listenerInterface is not None:
+			dependencies[_class.listenerInterface] = None
+		dependencies.pop(_class, None)
+		dependencies.pop(self._originals.get(_class), None)
+		return list(dependencies.keys())
+	
+	def _add_type_dependencies(self, _type, dependencies):
+		if isinstance(_type, (ClassType, EnumType)):
+			if _type.desc is not None:
+				dependencies[_type.desc] = None
+		elif isinstance(_type, ListType):
+			self._add_type_dependencies(_type.containedTypeDesc, dependencies)
+	
+	# Classes, interfaces and enums referenced by a class or an interface, in the order of their first reference
+	def dependencies_of(self, _class):
+		return list(self._dependencies.get(_class, []))
+	
+	# Classes and interfaces which reference a class, an interface or an enum
+	def dependents_of(self, obj):
+		return list(self._dependents.get(obj, []))
+	
+	# Parser of the same API as this one with other blacklists, which must not be
+	# less restrictive than the ones used to parse it. The parsed objects are
+	# shared, only the classes whose functions are blacklisted are copied, so
+	# that generators with their own blacklists can use the same parsing.
+	def restricted(self, methodBl, functionBl, classBl):
+		parser = copy.copy(self)
+		parser.methodBl = methodBl
+		parser.functionBl = functionBl
+		parser.classBl = classBl
+		parser._originals = {}
+		# The cache of the shared parsing is saved by the shared parser
+		parser._classCache = None
+		# The doc references are resolved and reported by each parser
+		parser.unresolvedReferences = collections.OrderedDict()
+		# Indexes filled in the same order as when parsing, so that they are
+		# iterated in the same order too
+		parser._init_class_indexes()
+		for index, sharedIndex in [(parser.classesIndex, self.classesIndex), (parser.interfacesIndex, self.interfacesIndex)]:
+			for name in index.keys():
+				_class = sharedIndex.get(name)
+				if type(_class) is Class:
+					_class = parser._restrict_class(_class)
+				index[name] = _class
+		for cclass in self.cProject.classes:
+			if cclass.name not in parser.classBl:
+				for funcname in _class_function_names(cclass):
+					method = self.methodsIndex.get(funcname)
+					if method is not None and not parser._is_blacklisted(method.name):
+						parser.methodsIndex[funcname] = method
+		parser._clean_all_indexes()
+		parser._index_all_dependencies()
+		return parser
+	
+	def _restrict_class(self, _class):
+		instanceMethods = [method for method in _class.instanceMethods if not self._is_blacklisted(method.name)]
+		classMethods = [method for method in _class.classMethods if not self._is_blacklisted(method.name)]
+		properties = []
+		for _property in _class.properties:
+			blacklisted = [method for method in [_property.setter, _property.getter] if method is not None and self._is_blacklisted(method.name)]
+			if len(blacklisted) > 0:
+				logger.error('Could not parse {0} property in {1}: {2} is blacklisted'.format(_property.name.to_snake_case(), _class.name.to_camel_case(fullName=True), blacklisted[0].name.to_c()))
+			else:
+				properties.append(_property)
+		if len(instanceMethods) == len(_class.instanceMethods) and len(classMethods) == len(_class.classMethods) and len(properties) == len(_class.properties):
+			return _class
+
+		restricted = Class(_class.name)
+		restricted.parent = _class.parent
+		restricted.briefDescription = _class.briefDescription
+		restricted.detailedDescription = _class.detailedDescription
+		restricted.deprecated = _class.deprecated
+		restricted.refcountable = _class.refcountable
+		restricted.multilistener = _class.multilistener
+		# The listener stays linked to the shared class
+		restricted._listenerInterface = _class.listenerInterface
+		restricted.properties = properties
+		restricted.instanceMethods = instanceMethods
+		restricted.classMethods = classMethods
+		self._originals[restricted] = _class
+		return restricted
+	
+	def _brief_doc(self, cObject):
+		return cObject.briefDoc if self.docs else None
 	
 	def parse_enum(self, cenum):
 		if 'associatedTypedef' in dir(cenum):
@@ -620,14 +1214,14 @@ class CParser(object):
 		name = EnumName()
 		name.from_camel_case(nameStr, namespace=self.namespace.name)
 		enum = Enum(name)
-		enum.briefDescription = cenum.briefDoc
+		enum.briefDescription = self._brief_doc(cenum)
 		self.namespace.add_child(enum)
 		
 		for cEnumValue in cenum.values:
 			valueName = EnumValueName()
 			valueName.from_camel_case(cEnumValue.name, namespace=name)
 			aEnumValue = EnumValue(valueName)
-			aEnumValue.briefDescription = cEnumValue.briefDoc
+			aEnumValue.briefDescription = self._brief_doc(cEnumValue)
 			if cEnumValue.value is not None:
 				try:
 					aEnumValue.value_from_string(cEnumValue.value)
@@ -639,23 +1233,46 @@ class CParser(object):
 		return enum
 	
 	def parse_class(self, cclass):
+		_class = self._parse_class_or_listener(cclass)
+		self._register_class(cclass, _class)
+		return _class
+	
+	def _try_parse_class(self, cclass):
+		try:
+			return self._parse_class_or_listener(cclass)
+		except BlacklistedException:
+			pass
+		except Error as e:
+			logger.error('Could not parse \'{0}\' class: {1}'.format(cclass.name, e.args[0]))
+		return None
+	
+	def _parse_class_or_listener(self, cclass):
 		if cclass.name in self.classBl:
 			raise BlacklistedException('{0} is blacklisted'.format(cclass.name));
 		
 		if cclass.name.endswith('Cbs'):
-			_class = self._parse_listener(cclass)
+			return self._parse_listener(cclass)
+		else:
+			return self._parse_class(cclass)
+	
+	def _register_class(self, cclass, _class):
+		if cclass.name.endswith('Cbs'):
 			self.interfacesIndex[cclass.name] = _class
 		else:
-			_class = self._parse_class(cclass)
 			self.classesIndex[cclass.name] = _class
 		self.namespace.add_child(_class)
-		return _class
+	
+	def _link_listener(self, _class, listenerName):
+		if self._listenerLinks is not None:
+			self._listenerLinks.append(listenerName)
+		else:
+			_class.listenerInterface = self.interfacesIndex[listenerName]
 	
 	def _parse_class(self, cclass):
 		name = ClassName()
 		name.from_camel_case(cclass.name, namespace=self.namespace.name)
 		_class = Class(name)
-		_class.briefDescription = cclass.briefDoc
+		_class.briefDescription = self._brief_doc(cclass)
 		_class.refcountable = self._class_is_refcountable(cclass)
 		
 		for cproperty in cclass.properties.values():
@@ -664,9 +1281,9 @@ class CParser(object):
 					absProperty = self._parse_property(cproperty, namespace=name)
 					_class.add_property(absProperty)
 				else:
-					_class.listenerInterface = self.interfacesIndex[cproperty.getter.returnArgument.ctype]
+					self._link_listener(_class, cproperty.getter.returnArgument.ctype)
 			except Error as e:
-				print('Could not parse {0} property in {1}: {2}'.format(cproperty.name, cclass.name, e.args[0]))
+				logger.error('Could not parse {0} property in {1}: {2}'.format(cproperty.name, cclass.name, e.args[0]))
 		
 		for cMethod in cclass.instanceMethods.values():
 			try:
@@ -674,7 +1291,7 @@ class CParser(object):
 				if method.name.to_snake_case() == 'add_callbacks' or method.name.to_snake_case() == 'remove_callbacks':
 					if _class.listenerInterface is None or not _class.multilistener:
 						_class.multilistener = True
-						_class.listenerInterface = self.interfacesIndex[_class.name.to_camel_case(fullName=True) + 'Cbs']
+						self._link_listener(_class, _class.name.to_camel_case(fullName=True) + 'Cbs')
 				elif isinstance(method.returnType, ClassType) and method.returnType.name.endswith('Cbs'):
 					pass
 				else:
@@ -683,7 +1300,7 @@ class CParser(object):
 			except BlacklistedException:
 				pass
 			except Error as e:
-				print('Could not parse {0} function: {1}'.format(cMethod.name, e.args[0]))
+				logger.error('Could not parse {0} function: {1}'.format(cMethod.name, e.args[0]))
 				
 		for cMethod in cclass.classMethods.values():
 			try:
@@ -692,7 +1309,7 @@ class CParser(object):
 			except BlacklistedException:
 				pass
 			except Error as e:
-				print('Could not parse {0} function: {1}'.format(cMethod.name, e.args[0]))
+				logger.error('Could not parse {0} function: {1}'.format(cMethod.name, e.args[0]))
 		
 		return _class
 	
@@ -718,12 +1335,12 @@ class CParser(object):
 		name.from_camel_case(cclass.name, namespace=self.namespace.name)
 		
 		if name.words[len(name.words)-1] == 'cbs':
-			name.words[len(name.words)-1] = 'listener'
+			name.words = name.words[:-1] + ['listener']
 		else:
 			raise Error('{0} is not a listener'.format(cclass.name))
 		
 		listener = Interface(name)
-		listener.briefDescription = cclass.briefDoc
+		listener.briefDescription = self._brief_doc(cclass)
 		
 		for property in cclass.properties.values():
 			if property.name != 'user_data':
@@ -731,14 +1348,14 @@ class CParser(object):
 					method = self._parse_listener_property(property, listener, cclass.events)
 					listener.add_method(method)
 				except Error as e:
-					print('Could not parse property \'{0}\' of listener \'{1}\': {2}'.format(property.name, cclass.name, e.args[0]))
+					logger.error('Could not parse property \'{0}\' of listener \'{1}\': {2}'.format(property.name, cclass.name, e.args[0]))
 		
 		return listener
 	
 	def _parse_listener_property(self, property, listener, events):
 		methodName = MethodName()
 		methodName.from_snake_case(property.name)
-		methodName.words.insert(0, 'on')
+		methodName.words = ['on'] + methodName.words
 		methodName.prev = listener.name
 		
 		if property.getter is not None:
@@ -753,6 +1370,7 @@ class CParser(object):
 		except KeyError:
 			raise Error('invalid event name \'{0}\''.format(eventName))
 		
+		unboundTypeCount = self._unboundTypeCount
 		method = Method(methodName)
 		method.returnType = self.parse_type(event.returnArgument)
 		for arg in event.arguments:
@@ -761,6 +1379,8 @@ class CParser(object):
 			argument = Argument(argName, self.parse_type(arg))
 			method.add_arguments(argument)
 		
+		if self._unboundTypeCount != unboundTypeCount:
+			self._unboundMethods.add(method)
 		return method
 	
 	def parse_method(self, cfunction, namespace, type=Method.Type.Instance):
@@ -770,8 +1390,9 @@ class CParser(object):
 		if self._is_blacklisted(name):
 			raise BlacklistedException('{0} is blacklisted'.format(name.to_c()));
 		
+		unboundTypeCount = self._unboundTypeCount
 		method = Method(name, type=type)
-		method.briefDescription = cfunction.briefDoc
+		method.briefDescription = self._brief_doc(cfunction)
 		method.deprecated = cfunction.deprecated
 		method.returnType = self.parse_type(cfunction.returnArgument)
 		
@@ -785,29 +1406,92 @@ class CParser(object):
 				absArg = Argument(argName, aType)
 				method.add_arguments(absArg)
 		
+		if self._unboundTypeCount != unboundTypeCount:
+			self._unboundMethods.add(method)
 		self.methodsIndex[cfunction.name] = method
 		return method
 	
 	def parse_type(self, cType):
+		key = (cType.ctype, cType.completeType, cType.containedType)
+		resolution = self._cTypes.get(key)
+		if resolution is None:
+			resolution = self._resolve_c_type(cType)
+			self._cTypes[key] = resolution
+		
+		if resolution.kind == 'base':
+			absType = BaseType(resolution.name, **dict(resolution.params))
+			bound = True
+		elif resolution.kind == 'enum':
+			absType = EnumType(resolution.name, enumDesc=self.enumsIndex[resolution.name])
+			bound = absType.desc is not None
+		elif resolution.kind == 'class':
+			absType = ClassType(resolution.name, classDesc=self._find_class_desc(resolution.name), **dict(resolution.params))
+			bound = absType.desc is not None
+		else:
+			absType = ListType(resolution.name)
+			containedTypeDesc = self._bind_contained_type(resolution.name)
+			if containedTypeDesc is not None:
+				absType.containedTypeDesc = containedTypeDesc
+			bound = containedTypeDesc is not None
+		if not bound:
+			self._unboundTypeCount += 1
+		
+		absType.cname = cType.completeType
+		return absType
+	
+	def _resolve_c_type(self, cType):
 		if cType.ctype in self.cBaseType or re.match(self.regexFixedSizeInteger, cType.ctype):
-			absType = self.parse_c_base_type(cType.completeType)
+			name, params = self._resolve_c_base_type(cType.completeType)
+			return CTypeResolution('base', name, params)
 		elif cType.ctype in self.enumsIndex:
-			absType = EnumType(cType.ctype, enumDesc=self.enumsIndex[cType.ctype])
+			return CTypeResolution('enum', cType.ctype, ())
 		elif cType.ctype in self.classesIndex or cType.ctype in self.interfacesIndex:
-			absType = ClassType(cType.ctype)
-			absType.isconst = cType.completeType.startswith('const ')
-			absType.isref = cType.completeType.endswith('*')
+			params = (('isconst', cType.completeType.startswith('const ')), ('isref', cType.completeType.endswith('*')))
+			return CTypeResolution('class', cType.ctype, params)
 		elif cType.ctype == self.cListType:
-			absType = ListType(cType.containedType)
+			return CTypeResolution('list', cType.containedType, ())
 		elif cType.ctype.endswith('Mask'):
-			absType = BaseType('integer', isUnsigned=True)
+			return CTypeResolution('base', 'integer', (('isUnsigned', True),))
 		else:
 			raise Error('Unknown C type \'{0}\''.format(cType.ctype))
-		
-		absType.cname = cType.completeType
-		return absType
+	
+	# The descs are bound as soon as the classes are parsed. The types referring to
+	# classes parsed later, or to enums in a worker process, are bound by
+	# _fix_all_types(), which must then find the same descs as here.
+	def _find_class_desc(self, name):
+		desc = self.classesIndex.get(name)
+		if desc is None and name not in self.classesIndex:
+			desc = self.interfacesIndex.get(name)
+		return desc
+	
+	def _bind_contained_type(self, name):
+		if name is None:
+			return None
+		elif name in self.classesIndex or name in self.interfacesIndex:
+			desc = self._find_class_desc(name)
+			return None if desc is None else ClassType(name, classDesc=desc)
+		elif name in self.enumsIndex:
+			desc = self.enumsIndex[name]
+			return None if desc is None else EnumType(name, enumDesc=desc)
+		else:
+			try:
+				return self.parse_c_base_type(name)
+			except Error:
+				# Reported by _fix_all_types()
+				return None
 	
 	def parse_c_base_type(self, cDecl):
+		name, params = self._resolve_c_base_type(cDecl)
+		return BaseType(name, **dict(params))
+	
+	def _resolve_c_base_type(self, cDecl):
+		resolution = self._cBaseTypes.get(cDecl)
+		if resolution is None:
+			resolution = self._parse_c_base_type(cDecl)
+			self._cBaseTypes[cDecl] = resolution
+		return resolution
+	
+	def _parse_c_base_type(self, cDecl):
 		declElems = cDecl.split(' ')
 		param = {}
 		name = None
@@ -865,6 +1549,18 @@ class CParser(object):
 		
 		
 		if name is not None:
-			return BaseType(name, **param)
+			return (name, tuple(sorted(param.items())))
 		else:
 			raise Error('could not find type in \'{0}\''.format(cDecl))
+
+
+_workerParser = None
+
+def _init_parsing_worker(parser, verbose):
+	global _workerParser
+	diagnostics.setup_worker(verbose)
+	parser._prepare_worker()
+	_workerParser = parser
+
+def _parse_class_in_worker(index):
+	return _workerParser._parse_class_in_worker(_workerParser.cProject.classes[index])
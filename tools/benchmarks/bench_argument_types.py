@@ -0,0 +1,88 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import diagnostics
+import genapixml as CApi
+
+
+def collect_argument_types(xmlfiles):
+	types = []
+	parse = CApi.parse_c_type
+	def recording_parse(t):
+		types.append(t)
+		return parse(t)
+	CApi.parse_c_type = recording_parse
+	try:
+		project = CApi.Project()
+		for f in xmlfiles:
+			project.parseFile(f)
+	finally:
+		CApi.parse_c_type = parse
+	return types
+
+
+def best_time(func, repeat):
+	best = None
+	for i in range(repeat):
+		start = timeit.default_timer()
+		func()
+		elapsed = timeit.default_timer() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return best
+
+
+def main(argv = None):
+	argparser = argparse.ArgumentParser(description="Measure the cost of parsing the C types of all the arguments of the API.")
+	argparser.add_argument('-r', '--repeat', type=int, default=5, help="Number of runs, the best one is reported (default: 5).")
+	argparser.add_argument('xmldir', help="XML directory generated by doxygen.")
+	args = argparser.parse_args(argv)
+	diagnostics.setup()
+
+	xmlfiles = [os.path.join(args.xmldir, f) for f in sorted(os.listdir(args.xmldir)) if f.endswith('.xml')]
+	types = collect_argument_types(xmlfiles)
+	print('{0} arguments, {1} distinct types'.format(len(types), len(set(t.strip() for t in types))))
+
+	def parse_uncached():
+		for t in types:
+			CApi._parse_c_type(t.strip())
+
+	def parse_cached():
+		for t in types:
+			CApi.parse_c_type(t)
+
+	def build_arguments():
+		for t in types:
+			CApi.CArgument(t)
+
+	uncached = best_time(parse_uncached, args.repeat)
+	cached = best_time(parse_cached, args.repeat)
+	arguments = best_time(build_arguments, args.repeat)
+	print('{0:<24} {1:>10} {2:>14}'.format('', 'time (s)', 'us/argument'))
+	for label, elapsed in [('type parsing', uncached), ('memoized type parsing', cached), ('CArgument creation', arguments)]:
+		print('{0:<24} {1:>10.4f} {2:>14.3f}'.format(label, elapsed, elapsed * 1e6 / max(len(types), 1)))
+	print('Speedup of memoized type parsing: {0:.1f}x'.format(uncached / max(cached, 1e-9)))
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import argparse
+import copy
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import diagnostics
+import genapixml as CApi
+
+
+def rename(name, tag):
+	if tag == '':
+		return name
+	return name.replace('Linphone', 'Linphone' + tag).replace('linphone_', 'linphone_' + tag.lower() + '_')
+
+
+def clone_argument(arg, tag):
+	clone = copy.copy(arg)
+	clone.ctype = rename(arg.ctype, tag)
+	clone.completeType = rename(arg.completeType, tag)
+	return clone
+
+
+def clone_object(obj, tag):
+	clone = copy.copy(obj)
+	clone.name = rename(obj.name, tag)
+	if isinstance(obj, CApi.CTypedef):
+		clone.definition = rename(obj.definition, tag)
+	if isinstance(obj, CApi.CFunction):
+		clone.returnArgument = clone_argument(obj.returnArgument, tag)
+		clone.arguments = CApi.CArgumentsList()
+		for arg in obj.arguments:
+			clone.arguments.addArgument(clone_argument(arg, tag))
+	return clone
+
+
+def clone_parsed_file(parsedFile, tag):
+	clone = CApi.ParsedFile(parsedFile.path)
+	clone.enums = [clone_object(e, tag) for e in parsedFile.enums]
+	clone.structs = [clone_object(st, tag) for st in parsedFile.structs]
+	clone.typedefs = [clone_object(td, tag) for td in parsedFile.typedefs]
+	clone.functions = [clone_object(f, tag) for f in parsedFile.functions]
+	return clone
+
+
+def scale_parsed_files(parsedFiles, factor):
+	scaled = list(parsedFiles)
+	for i in range(1, factor):
+		tag = 'Synth{0}'.format(i)
+		scaled += [clone_parsed_file(pf, tag) for pf in parsedFiles]
+	return scaled
+
+
+def main(argv = None):
+	argparser = argparse.ArgumentParser(description="Measure how class discovery scales with the size of the API.")
+	argparser.add_argument('-s', '--scales', metavar='N', type=int, nargs='+', default=[1, 2, 5, 10], help="Sizes of the API to test, as multiples of the real API (default: 1 2 5 10).")
+	argparser.add_argument('-r', '--repeat', type=int, default=3, help="Number of runs for each size, the best one is reported (default: 3).")
+	argparser.add_argument('xmldir', help="XML directory generated by doxygen.")
+	args = argparser.parse_args(argv)
+	diagnostics.setup()
+
+	project = CApi.Project()
+	xmlfiles = [os.path.join(args.xmldir, f) for f in sorted(os.listdir(args.xmldir)) if f.endswith('.xml')]
+	parsedFiles = [pf for pf in [project.parseFile(f) for f in xmlfiles] if pf is not None]
+
+	print('{0:>6} {1:>10} {2:>8} {3:>10} {4:>14}'.format('scale', 'functions', 'classes', 'time (s)', 'us/function'))
+	for factor in args.scales:
+		scaled = scale_parsed_files(parsedFiles, factor)
+		nbFunctions = sum(len(pf.functions) + len(pf.typedefs) for pf in scaled)
+		best = None
+		for i in range(args.repeat):
+			# Class discovery modifies the records it is given, work on fresh copies for each run
+			records = [clone_parsed_file(pf, '') for pf in scaled]
+			project = CApi.Project()
+			start = timeit.default_timer()
+			project.initFromParsedFiles(records)
+			elapsed = timeit.default_timer() - start
+			best = elapsed if best is None else min(best, elapsed)
+		print('{0:>6} {1:>10} {2:>8} {3:>10.3f} {4:>14.2f}'.format(str(factor) + 'x', nbFunctions, len(project.classes), best, best * 1e6 / max(nbFunctions, 1)))
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+# Measure the memory used by the nodes of the abstract API model. The model of
+# an older revision can be measured by giving the tools directory of a checkout
+# of that revision, e.g.:
+#   git worktree add /tmp/before <revision>
+#   bench_model_memory.py --compare-with /tmp/before/tools <xmldir>
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import timeit
+
+
+def node_size(node, seen):
+	"""Size of a node of the model and of its dictionaries, if it has some. Nodes already counted are skipped."""
+	if node is None or id(node) in seen:
+		return 0
+	seen.add(id(node))
+	size = sys.getsizeof(node)
+	if hasattr(node, '__dict__'):
+		size += sys.getsizeof(node.__dict__)
+	# Cache of the conversions of the names
+	conversions = getattr(node, '_conversions', None)
+	if conversions is not None:
+		size += sys.getsizeof(conversions)
+	return size
+
+
+def type_size(_type, seen):
+	size = node_size(_type, seen)
+	if type(_type).__name__ == 'ListType':
+		size += node_size(_type.containedTypeDesc, seen)
+	return size
+
+
+def method_size(method, seen):
+	size = node_size(method, seen) + node_size(method.name, seen) + type_size(method.returnType, seen)
+	for arg in method.args:
+		size += node_size(arg, seen) + node_size(arg.name, seen) + type_size(arg.type, seen)
+	return size
+
+
+def measure(parser):
+	seen = set()
+	methods = []
+	classes = []
+	for _class in parser.classesIndex.values():
+		if _class is None:
+			continue
+		classes.append(_class)
+		for _property in _class.properties:
+			for method in [_property.setter, _property.getter]:
+				if method is not None:
+					methods.append(method)
+		methods += _class.instanceMethods
+		methods += _class.classMethods
+	for interface in parser.interfacesIndex.values():
+		if interface is not None:
+			classes.append(interface)
+			methods += interface.methods
+
+	methodsSize = 0
+	for method in methods:
+		methodsSize += method_size(method, seen)
+	classesSize = 0
+	for _class in classes:
+		classesSize += node_size(_class, seen) + node_size(_class.name, seen)
+		for _property in getattr(_class, 'properties', []):
+			classesSize += node_size(_property, seen) + node_size(_property.name, seen)
+	return {
+		'methods': len(methods),
+		'classes': len(classes),
+		'bytes_per_method': float(methodsSize) / max(len(methods), 1),
+		'bytes_per_class': float(classesSize) / max(len(classes), 1)
+	}
+
+
+def run(toolsdir, xmldir):
+	sys.path.insert(0, toolsdir)
+	import genapixml as CApi
+	import abstractapi as AbsApi
+
+	project = CApi.Project()
+	if hasattr(project, 'initFromDirOrSnapshot'):
+		project.initFromDirOrSnapshot(xmldir)
+	else:
+		project.initFromDir(xmldir)
+	project.check()
+	parser = AbsApi.CParser(project)
+	start = timeit.default_timer()
+	parser.parse_all()
+	result = measure(parser)
+	result['parse_time'] = timeit.default_timer() - start
+	return result
+
+
+def print_result(label, result):
+	print('{0:<10} {1:>8} {2:>8} {3:>12.1f} {4:>12.1f} {5:>12.3f}'.format(label, result['methods'], result['classes'], result['bytes_per_method'], result['bytes_per_class'], result['parse_time']))
+
+
+def main(argv = None):
+	argparser = argparse.ArgumentParser(description="Measure the memory used by the abstract API model, per method and per class.")
+	argparser.add_argument('--tools', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'), help="Tools directory of the revision to measure (default: the one of this script).")
+	argparser.add_argument('--compare-with', metavar='TOOLS', help="Also measure the model of the tools directory of another revision.")
+	argparser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+	argparser.add_argument('xmldir', help="XML directory generated by doxygen.")
+	args = argparser.parse_args(argv)
+
+	if args.json:
+		# The generators log to the standard output, until they exit
+		stdout = sys.stdout
+		sys.stdout = sys.stderr
+		result = run(os.path.abspath(args.tools), args.xmldir)
+		stdout.write(json.dumps(result) + '\n')
+		return 0
+
+	results = []
+	if args.compare_with is not None:
+		output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--json', '--tools', args.compare_with, args.xmldir])
+		results.append(('before', json.loads(output.decode('utf-8'))))
+	output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--json', '--tools', args.tools, args.xmldir])
+	results.append(('current', json.loads(output.decode('utf-8'))))
+
+	print('{0:<10} {1:>8} {2:>8} {3:>12} {4:>12} {5:>12}'.format('', 'methods', 'classes', 'B/method', 'B/class', 'parse (s)'))
+	for label, result in results:
+		print_result(label, result)
+	if len(results) == 2:
+		before = results[0][1]
+		current = results[1][1]
+		print('Memory per method: {0:.0%}, per class: {1:.0%} of the previous revision'.format(
+			current['bytes_per_method'] / max(before['bytes_per_method'], 1), current['bytes_per_class'] / max(before['bytes_per_class'], 1)))
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
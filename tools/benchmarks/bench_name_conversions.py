@@ -0,0 +1,134 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import argparse
+import os
+import pickle
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import diagnostics
+import genapixml as CApi
+import abstractapi as AbsApi
+
+
+WRAPPERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'wrappers')
+
+
+def load_generator(name, path):
+	# Both generators are named genwrapper, they cannot be imported as usual
+	try:
+		import importlib.util
+		spec = importlib.util.spec_from_file_location(name, path)
+		module = importlib.util.module_from_spec(spec)
+		spec.loader.exec_module(module)
+		return module
+	except ImportError:
+		import imp
+		return imp.load_source(name, path)
+
+
+def translate_cpp(parser, cpp):
+	translator = cpp.CppTranslator()
+	header = cpp.EnumsHeader(translator)
+	for enum in parser.enumsIndex.values():
+		if enum is not None:
+			header.add_enum(enum)
+	for _class in list(parser.interfacesIndex.values()) + list(parser.classesIndex.values()):
+		if _class is not None:
+			try:
+				cpp.ClassHeader(_class, translator, parser)
+			except AbsApi.Error:
+				pass
+
+
+def translate_csharp(parser, csharp):
+	translator = csharp.CsharpTranslator()
+	for enum in parser.enumsIndex.values():
+		if enum is not None:
+			csharp.EnumImpl(enum, translator)
+	for _class in list(parser.classesIndex.values()) + list(parser.interfacesIndex.values()):
+		if _class is not None:
+			try:
+				if type(_class) is AbsApi.Class:
+					csharp.ClassImpl(_class, translator)
+				else:
+					csharp.InterfaceImpl(_class, translator)
+			except AbsApi.Error:
+				pass
+
+
+def uncached_conversions(name):
+	return {}
+
+
+def best_time(func, repeat, setup=None):
+	best = None
+	for i in range(repeat):
+		arg = setup() if setup is not None else None
+		start = timeit.default_timer()
+		func(arg)
+		elapsed = timeit.default_timer() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return best
+
+
+def main(argv = None):
+	argparser = argparse.ArgumentParser(description="Measure the time spent by the C++ and C# generators on translating the abstract API, with and without the cache of name conversions. The first pass translates an API whose names have no conversion cached yet, as in a run of a generator, the next passes translate the same API again.")
+	argparser.add_argument('-r', '--repeat', type=int, default=3, help="Number of runs, the best one is reported (default: 3).")
+	argparser.add_argument('xmldir', help="XML directory generated by doxygen, or snapshot saved by genapixml.py --snapshot.")
+	args = argparser.parse_args(argv)
+	diagnostics.setup()
+
+	project = CApi.Project()
+	project.initFromDirOrSnapshot(args.xmldir)
+	project.check()
+	parser = AbsApi.CParser(project)
+	parser.parse_all()
+	# Each first pass translates a copy of the API that has never been translated, so that its names have no
+	# conversion cached yet, as in a run of a generator
+	sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+	snapshot = pickle.dumps(parser, pickle.HIGHEST_PROTOCOL)
+	def fresh_parser():
+		return pickle.loads(snapshot)
+
+	generators = []
+	for label, name, translate in [('C++', 'cpp', translate_cpp), ('C#', 'csharp', translate_csharp)]:
+		try:
+			module = load_generator(name + '_genwrapper', os.path.join(WRAPPERS_DIR, name, 'genwrapper.py'))
+		except SyntaxError:
+			print('{0} generator cannot be loaded with this version of Python, skipped'.format(label))
+			continue
+		generators.append((label, module, translate))
+
+	print('{0:<16} {1:>14} {2:>14} {3:>10} {4:>14} {5:>10}'.format('translation', 'uncached (s)', 'first pass (s)', 'speedup', 'next pass (s)', 'speedup'))
+	getConversions = AbsApi.Name._get_conversions
+	for label, module, translate in generators:
+		AbsApi.Name._get_conversions = uncached_conversions
+		try:
+			uncached = best_time(lambda parser: translate(parser, module), args.repeat, fresh_parser)
+		finally:
+			AbsApi.Name._get_conversions = getConversions
+		firstPass = best_time(lambda parser: translate(parser, module), args.repeat, fresh_parser)
+		nextPass = best_time(lambda unused: translate(parser, module), args.repeat + 1)
+		print('{0:<16} {1:>14.4f} {2:>14.4f} {3:>9.1f}x {4:>14.4f} {5:>9.1f}x'.format(label, uncached, firstPass, uncached / max(firstPass, 1e-9), nextPass, uncached / max(nextPass, 1e-9)))
+
+
+if __name__ == "__main__":
+	sys.exit(main())
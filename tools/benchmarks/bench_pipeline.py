@@ -0,0 +1,174 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import argparse
+import collections
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import doxygen_synth
+
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+TOOLS_DIR = os.path.join(BENCHMARKS_DIR, '..')
+WRAPPERS_DIR = os.path.join(TOOLS_DIR, '..', 'wrappers')
+
+PRESETS = collections.OrderedDict([('1x', 1), ('10x', 10), ('50x', 50)])
+
+
+class Stage(object):
+	def __init__(self, name, script, args, cwd=None):
+		self.name = name
+		self.script = script
+		self.args = args
+		self.cwd = cwd
+
+
+def pipeline_stages(workdir):
+	xmldir = os.path.join(workdir, 'xml')
+	apixml = os.path.join(workdir, 'api.xml')
+	return [
+		Stage('genapixml', os.path.join(TOOLS_DIR, 'genapixml.py'), ['-o', apixml, xmldir]),
+		Stage('cpp', os.path.join(WRAPPERS_DIR, 'cpp', 'genwrapper.py'), ['-o', os.path.join(workdir, 'cpp'), xmldir]),
+		Stage('csharp', os.path.join(WRAPPERS_DIR, 'csharp', 'genwrapper.py'), ['-o', os.path.join(workdir, 'cs'), xmldir]),
+		# apixml2python looks for its templates relatively to the working directory
+		Stage('python', os.path.join(TOOLS_DIR, 'python', 'apixml2python.py'), ['-o', os.path.join(workdir, 'linphone.c'), apixml], cwd=os.path.join(TOOLS_DIR, 'python'))
+	]
+
+
+def run_stage(python, stage, workdir, phases):
+	rssfile = os.path.join(workdir, stage.name + '.rss')
+	profilefile = os.path.join(workdir, stage.name + '.json')
+	command = [python, os.path.join(BENCHMARKS_DIR, 'stage_runner.py'), rssfile, stage.script]
+	if phases:
+		command += ['--profile-json', profilefile]
+	command += stage.args
+	with open(os.path.join(workdir, stage.name + '.log'), 'w') as log:
+		start = timeit.default_timer()
+		status = subprocess.call(command, cwd=stage.cwd, stdout=log, stderr=subprocess.STDOUT)
+		elapsed = timeit.default_timer() - start
+	if status != 0:
+		raise RuntimeError("stage '{0}' failed with status {1}, see {2}".format(stage.name, status, log.name))
+	result = collections.OrderedDict([('wall_time', elapsed), ('peak_rss', None), ('phases', [])])
+	with open(rssfile) as f:
+		result['peak_rss'] = int(f.read())
+	if phases:
+		with open(profilefile) as f:
+			result['phases'] = json.load(f)['phases']
+	return result
+
+
+def run_pipeline(python, size, workdir, stageNames, phases):
+	doxygen_synth.generate(os.path.join(workdir, 'xml'), size)
+	for outdir in ['cpp', 'cs']:
+		os.makedirs(os.path.join(workdir, outdir))
+	results = collections.OrderedDict()
+	for stage in pipeline_stages(workdir):
+		if stage.name in stageNames:
+			results[stage.name] = run_stage(python, stage, workdir, phases)
+	return results
+
+
+def print_results(preset, results):
+	for stageName, result in results.items():
+		print('{0:>6} {1:<28} {2:>10.3f} {3:>12.1f}'.format(preset, stageName, result['wall_time'], result['peak_rss'] / 1024.0))
+		for phase in result['phases']:
+			peak = '' if phase['peak_memory'] is None else '{0:.1f}'.format(phase['peak_memory'] / (1024.0 * 1024.0))
+			print('{0:>6}   {1:<26} {2:>10.3f} {3:>12}'.format('', phase['name'], phase['wall_time'], peak))
+
+
+def compare(runs, baseline, tolerance):
+	"""Print the ratio of the current times and memory to the baseline ones, and return the number of regressions."""
+	regressions = 0
+	print('')
+	print('{0:>6} {1:<12} {2:>12} {3:>12} {4:>10}'.format('preset', 'stage', 'time ratio', 'rss ratio', ''))
+	for preset, run in runs.items():
+		baselineRun = baseline['runs'].get(preset)
+		if baselineRun is None or baselineRun['size'] != run['size']:
+			print('{0:>6} no baseline for this size'.format(preset))
+			continue
+		for stageName, result in run['stages'].items():
+			baselineResult = baselineRun['stages'].get(stageName)
+			if baselineResult is None:
+				continue
+			timeRatio = result['wall_time'] / max(baselineResult['wall_time'], 1e-9)
+			rssRatio = float(result['peak_rss']) / max(baselineResult['peak_rss'], 1)
+			status = ''
+			if timeRatio > 1 + tolerance or rssRatio > 1 + tolerance:
+				status = 'REGRESSION'
+				regressions += 1
+			print('{0:>6} {1:<12} {2:>12.2f} {3:>12.2f} {4:>10}'.format(preset, stageName, timeRatio, rssRatio, status))
+	return regressions
+
+
+def main(argv = None):
+	stageNames = [stage.name for stage in pipeline_stages('')]
+	argparser = argparse.ArgumentParser(description="Run the whole generation pipeline on synthetic APIs and measure the time and memory of each stage.")
+	argparser.add_argument('-p', '--presets', nargs='+', choices=list(PRESETS.keys()), default=['1x'], help="Sizes of the synthetic API, as multiples of the size of the real API (default: 1x).")
+	argparser.add_argument('--classes', type=int, default=doxygen_synth.REFERENCE_SIZE.classes, help="Number of classes at 1x (default: {0}).".format(doxygen_synth.REFERENCE_SIZE.classes))
+	argparser.add_argument('--methods', type=int, default=doxygen_synth.REFERENCE_SIZE.methods, help="Number of methods per class (default: {0}).".format(doxygen_synth.REFERENCE_SIZE.methods))
+	argparser.add_argument('--properties', type=int, default=doxygen_synth.REFERENCE_SIZE.properties, help="Number of properties per class (default: {0}).".format(doxygen_synth.REFERENCE_SIZE.properties))
+	argparser.add_argument('--callbacks', type=int, default=doxygen_synth.REFERENCE_SIZE.callbacks, help="Number of callbacks per class (default: {0}).".format(doxygen_synth.REFERENCE_SIZE.callbacks))
+	argparser.add_argument('--enums', type=int, default=doxygen_synth.REFERENCE_SIZE.enums, help="Number of enums per class (default: {0}).".format(doxygen_synth.REFERENCE_SIZE.enums))
+	argparser.add_argument('--paragraphs', type=int, default=doxygen_synth.REFERENCE_SIZE.paragraphs, help="Number of paragraphs in the detailed description of methods (default: {0}).".format(doxygen_synth.REFERENCE_SIZE.paragraphs))
+	argparser.add_argument('-s', '--stages', nargs='+', choices=stageNames, default=stageNames, help="Stages of the pipeline to run (default: all).")
+	argparser.add_argument('--python', default=sys.executable, help="Python interpreter used to run the generators (default: the current one).")
+	argparser.add_argument('--phases', action='store_true', help="Also report the phases of each stage, measured with --profile-json. Memory tracing slows the generators down.")
+	argparser.add_argument('--save', metavar='FILE', help="Save the results to a JSON file, to be used as a baseline.")
+	argparser.add_argument('--compare', metavar='FILE', help="Compare the results with a baseline saved with --save.")
+	argparser.add_argument('--tolerance', type=float, default=0.1, help="Relative increase of time or memory over the baseline reported as a regression (default: 0.1).")
+	argparser.add_argument('--workdir', help="Directory where the synthetic API and the generated files are written. A temporary directory is used and removed by default.")
+	args = argparser.parse_args(argv)
+
+	size = doxygen_synth.ApiSize(args.classes, args.methods, args.properties, args.callbacks, args.enums, args.paragraphs)
+	workdir = args.workdir if args.workdir is not None else tempfile.mkdtemp(prefix='linphone-bench-')
+	runs = collections.OrderedDict()
+	try:
+		print('{0:>6} {1:<28} {2:>10} {3:>12}'.format('preset', 'stage', 'time (s)', 'peak (MB)'))
+		for preset in args.presets:
+			scaledSize = size.scaled(PRESETS[preset])
+			presetdir = os.path.join(workdir, preset)
+			if os.path.exists(presetdir):
+				shutil.rmtree(presetdir)
+			os.makedirs(presetdir)
+			results = run_pipeline(args.python, scaledSize, presetdir, args.stages, args.phases)
+			runs[preset] = collections.OrderedDict([('size', scaledSize.to_dict()), ('stages', results)])
+			print_results(preset, results)
+	finally:
+		if args.workdir is None:
+			shutil.rmtree(workdir)
+
+	if args.save is not None:
+		with open(args.save, 'w') as f:
+			json.dump({'python': args.python, 'runs': runs}, f, indent=2)
+			f.write('\n')
+	if args.compare is not None:
+		with open(args.compare) as f:
+			baseline = json.load(f)
+		if compare(runs, baseline, args.tolerance) > 0:
+			return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
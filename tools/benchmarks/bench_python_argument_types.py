@@ -0,0 +1,109 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import argparse
+import logging
+import os
+import sys
+import timeit
+import xml.etree.ElementTree as ET
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+TOOLS_DIR = os.path.join(BENCHMARKS_DIR, '..')
+PYTHON_DIR = os.path.join(TOOLS_DIR, 'python')
+
+sys.path.insert(0, TOOLS_DIR)
+sys.path.insert(0, PYTHON_DIR)
+import diagnostics
+from apixml2python import linphone
+
+
+def load_script():
+	# The blacklists and the hand written code are defined by the script, which
+	# has the same name as the package
+	path = os.path.join(PYTHON_DIR, 'apixml2python.py')
+	try:
+		import importlib.util
+		spec = importlib.util.spec_from_file_location('apixml2python_script', path)
+		module = importlib.util.module_from_spec(spec)
+		spec.loader.exec_module(module)
+		return module
+	except ImportError:
+		import imp
+		return imp.load_source('apixml2python_script', path)
+
+
+class UncachedTypes(object):
+	"""Analyze the type of an argument each time it is needed, as it was done before the types were cached."""
+
+	def __enter__(self):
+		self.argument_type = linphone.LinphoneModule.argument_type
+		self.argument_types = linphone.MethodDefinition.argument_types
+		self.count = 0
+		def argument_type(module, basic_type, complete_type, contained_type):
+			self.count += 1
+			return linphone.ArgumentType(basic_type, complete_type, contained_type, module)
+		def argument_types(method):
+			return [method.linphone_module.argument_type(arg.get('type'), arg.get('completetype'), arg.get('containedtype')) for arg in method.xml_method_args]
+		linphone.LinphoneModule.argument_type = argument_type
+		linphone.MethodDefinition.argument_types = argument_types
+		return self
+
+	def __exit__(self, *args):
+		linphone.LinphoneModule.argument_type = self.argument_type
+		linphone.MethodDefinition.argument_types = self.argument_types
+
+
+def best_time(func, repeat):
+	best = None
+	for i in range(repeat):
+		start = timeit.default_timer()
+		func()
+		elapsed = timeit.default_timer() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return best
+
+
+def main(argv = None):
+	argparser = argparse.ArgumentParser(description="Measure the cost of analyzing the types of the arguments while building the Python wrapper.")
+	argparser.add_argument('-r', '--repeat', type=int, default=5, help="Number of runs, the best one is reported (default: 5).")
+	argparser.add_argument('apixmlfile', help="XML file of the Linphone API generated by genapixml.py.")
+	args = argparser.parse_args(argv)
+
+	diagnostics.setup()
+	# The deprecated methods are reported on each run
+	logging.getLogger(diagnostics.ROOT_LOGGER_NAME).setLevel(logging.ERROR)
+	script = load_script()
+	tree = ET.parse(args.apixmlfile)
+
+	def build_module():
+		return linphone.LinphoneModule(tree, script.blacklisted_classes, script.blacklisted_events, script.blacklisted_functions, script.hand_written_functions)
+
+	with UncachedTypes() as uncachedTypes:
+		uncached = best_time(build_module, args.repeat)
+		analyses = uncachedTypes.count // args.repeat
+	cached = best_time(build_module, args.repeat)
+	print('{0} type analyses without the cache, {1} distinct types'.format(analyses, len(build_module().argument_types)))
+	print('{0:<24} {1:>10}'.format('', 'time (s)'))
+	for label, elapsed in [('uncached types', uncached), ('cached types', cached)]:
+		print('{0:<24} {1:>10.4f}'.format(label, elapsed))
+	print('Speedup of the module building: {0:.2f}x'.format(uncached / max(cached, 1e-9)))
+
+
+if __name__ == "__main__":
+	sys.exit(main())
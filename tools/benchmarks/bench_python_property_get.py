@@ -0,0 +1,90 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+# Compare the throughput of a property getter of the Python wrapper between
+# builds, typically a debug build defining PYLINPHONE_TRACE and a release build,
+# or a wrapper generated with apixml2python.py --no-trace. Each build is the
+# directory containing its linphone package, and is measured in its own
+# process as all of them are named linphone.
+
+import argparse
+import json
+import subprocess
+import sys
+import timeit
+
+
+def measure(iterations, repeat, logHandler):
+	import linphone
+	if logHandler:
+		linphone.set_log_handler(lambda level, msg: None)
+	address = linphone.Factory.get().create_address('sip:bench@example.org')
+	def get_username():
+		for i in range(iterations):
+			address.username
+	best = None
+	for i in range(repeat):
+		start = timeit.default_timer()
+		get_username()
+		elapsed = timeit.default_timer() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return best
+
+
+def run_build(python, path, iterations, repeat, logHandler):
+	command = [python, __file__, '--measure', path, '-n', str(iterations), '-r', str(repeat)]
+	if logHandler:
+		command.append('--log-handler')
+	return json.loads(subprocess.check_output(command).decode('utf-8'))['time']
+
+
+def main(argv = None):
+	argparser = argparse.ArgumentParser(description="Measure the throughput of Address.username in several builds of the Python wrapper.")
+	argparser.add_argument('builds', nargs='*', metavar='NAME=PATH', help="Name of a build and directory containing its linphone package, e.g. trace=build-debug release=build-release.")
+	argparser.add_argument('-n', '--iterations', type=int, default=1000000, help="Number of property gets per run (default: 1000000).")
+	argparser.add_argument('-r', '--repeat', type=int, default=5, help="Number of runs, the best one is reported (default: 5).")
+	argparser.add_argument('--log-handler', action='store_true', help="Set a log handler, which receives the traces of the builds defining PYLINPHONE_TRACE.")
+	argparser.add_argument('--python', default=sys.executable, help="Python interpreter the builds are made for (default: the current one).")
+	argparser.add_argument('--measure', metavar='PATH', help=argparse.SUPPRESS)
+	args = argparser.parse_args(argv)
+
+	if args.measure is not None:
+		sys.path.insert(0, args.measure)
+		print(json.dumps({'time': measure(args.iterations, args.repeat, args.log_handler)}))
+		return 0
+
+	if len(args.builds) == 0:
+		argparser.error('no build to measure')
+	results = []
+	for build in args.builds:
+		name, separator, path = build.partition('=')
+		if separator == '':
+			argparser.error("'{0}' is not of the form NAME=PATH".format(build))
+		results.append((name, run_build(args.python, path, args.iterations, args.repeat, args.log_handler)))
+	print('{0:<16} {1:>10} {2:>12} {3:>14}'.format('build', 'time (s)', 'ns/get', 'gets/s'))
+	for name, elapsed in results:
+		print('{0:<16} {1:>10.4f} {2:>12.1f} {3:>14.0f}'.format(name, elapsed, elapsed * 1e9 / args.iterations, args.iterations / max(elapsed, 1e-9)))
+	if len(results) > 1:
+		reference = results[0]
+		for name, elapsed in results[1:]:
+			print('Speedup of {0} over {1}: {2:.2f}x'.format(name, reference[0], reference[1] / max(elapsed, 1e-9)))
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
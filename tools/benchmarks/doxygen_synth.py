@@ -0,0 +1,235 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import argparse
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+
+LOREM = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua."
+
+
+class ApiSize(object):
+	def __init__(self, classes, methods, properties, callbacks, enums, paragraphs):
+		self.classes = classes
+		self.methods = methods
+		self.properties = properties
+		self.callbacks = callbacks
+		self.enums = enums
+		self.paragraphs = paragraphs
+
+	def scaled(self, factor):
+		return ApiSize(self.classes * factor, self.methods, self.properties, self.callbacks, self.enums, self.paragraphs)
+
+	def to_dict(self):
+		return {
+			'classes' : self.classes,
+			'methods' : self.methods,
+			'properties' : self.properties,
+			'callbacks' : self.callbacks,
+			'enums' : self.enums,
+			'paragraphs' : self.paragraphs
+		}
+
+
+# Roughly the size of the real API: about 80 classes and 2000 functions
+REFERENCE_SIZE = ApiSize(classes=80, methods=10, properties=6, callbacks=2, enums=1, paragraphs=2)
+
+
+def add_paragraph(parent, text, refs=[]):
+	para = ET.SubElement(parent, 'para')
+	para.text = text
+	for ref in refs:
+		refNode = ET.SubElement(para, 'ref', {'refid': 'synth', 'kindref': 'member'})
+		refNode.text = ref
+		refNode.tail = ' and more text about it. '
+	return para
+
+
+def add_description(parent, tag, text, refs=[]):
+	desc = ET.SubElement(parent, tag)
+	if text is not None:
+		add_paragraph(desc, text, refs)
+	return desc
+
+
+def add_type(parent, t):
+	typeNode = ET.SubElement(parent, 'type')
+	typeNode.text = t
+	return typeNode
+
+
+def add_function(section, name, returnType, args, brief, returnDoc=None, containedType=None, deprecated=False, paragraphs=1, refs=[], briefRefs=[]):
+	memberdef = ET.SubElement(section, 'memberdef', {'kind': 'function', 'prot': 'public', 'static': 'no', 'id': name})
+	add_type(memberdef, returnType)
+	ET.SubElement(memberdef, 'definition').text = returnType + ' ' + name
+	ET.SubElement(memberdef, 'argsstring').text = '(' + ', '.join(t + ' ' + n for t, n in args) + ')'
+	ET.SubElement(memberdef, 'name').text = name
+	for t, n in args:
+		param = ET.SubElement(memberdef, 'param')
+		add_type(param, t)
+		ET.SubElement(param, 'declname').text = n
+	add_description(memberdef, 'briefdescription', brief, briefRefs)
+	detailed = ET.SubElement(memberdef, 'detaileddescription')
+	for i in range(paragraphs):
+		add_paragraph(detailed, 'Paragraph {0} about {1}. {2}'.format(i, name, LOREM), refs if i == 0 else [])
+	para = add_paragraph(detailed, None)
+	if len(args) > 0:
+		paramList = ET.SubElement(para, 'parameterlist', {'kind': 'param'})
+		for t, n in args:
+			item = ET.SubElement(paramList, 'parameteritem')
+			ET.SubElement(ET.SubElement(item, 'parameternamelist'), 'parametername').text = n
+			add_paragraph(ET.SubElement(item, 'parameterdescription'), 'The {0} parameter'.format(n))
+	if returnDoc is not None:
+		returnPara = add_paragraph(ET.SubElement(para, 'simplesect', {'kind': 'return'}), returnDoc)
+		if containedType is not None:
+			ET.SubElement(returnPara, 'bctbxlist').text = containedType
+	if deprecated:
+		xrefsect = ET.SubElement(para, 'xrefsect', {'id': 'deprecated'})
+		ET.SubElement(xrefsect, 'xreftitle').text = 'Deprecated'
+		ET.SubElement(xrefsect, 'xrefdescription')
+	ET.SubElement(memberdef, 'location', {'file': 'include/linphone/synth.h', 'line': '1'})
+
+
+def add_typedef(section, name, definition, brief):
+	memberdef = ET.SubElement(section, 'memberdef', {'kind': 'typedef', 'prot': 'public', 'static': 'no', 'id': name})
+	ET.SubElement(memberdef, 'definition').text = definition
+	ET.SubElement(memberdef, 'name').text = name
+	add_description(memberdef, 'briefdescription', brief)
+	add_description(memberdef, 'detaileddescription', 'More about ' + name)
+
+
+def add_enum(section, name, values, brief):
+	memberdef = ET.SubElement(section, 'memberdef', {'kind': 'enum', 'prot': 'public', 'static': 'no', 'id': name})
+	ET.SubElement(memberdef, 'name').text = name
+	for i, value in enumerate(values):
+		enumvalue = ET.SubElement(memberdef, 'enumvalue', {'prot': 'public', 'id': value})
+		ET.SubElement(enumvalue, 'name').text = value
+		if i % 3 == 0:
+			ET.SubElement(enumvalue, 'initializer').text = '= {0}'.format(i)
+		add_description(enumvalue, 'briefdescription', 'Value ' + value)
+		add_description(enumvalue, 'detaileddescription', None)
+	add_description(memberdef, 'briefdescription', brief)
+	add_description(memberdef, 'detaileddescription', 'Detailed enum ' + name)
+
+
+def write_xml(root, path):
+	# Doxygen puts line breaks between nodes, and the generators rely on tails to be set
+	for node in root.iter():
+		if node.tail is None:
+			node.tail = '\n'
+	ET.ElementTree(root).write(path, encoding='utf-8')
+
+
+def generate_class(outdir, index, size):
+	name = 'Synth{0}'.format(index)
+	cname = 'Linphone' + name
+	prefix = 'linphone_' + name.lower() + '_'
+	peer = 'LinphoneSynth{0}'.format((index + 1) % size.classes)
+	root = ET.Element('doxygen')
+	compounddef = ET.SubElement(root, 'compounddef', {'kind': 'group', 'id': 'group__' + name.lower()})
+	ET.SubElement(compounddef, 'compoundname').text = name.lower()
+	typedefs = ET.SubElement(compounddef, 'sectiondef', {'kind': 'typedef'})
+	enums = ET.SubElement(compounddef, 'sectiondef', {'kind': 'enum'})
+	functions = ET.SubElement(compounddef, 'sectiondef', {'kind': 'func'})
+
+	add_typedef(typedefs, cname, 'typedef struct _' + cname + ' ' + cname, 'The ' + cname + ' object.')
+	add_typedef(typedefs, cname + 'Cbs', 'typedef struct _' + cname + 'Cbs ' + cname + 'Cbs', 'Callbacks of ' + cname + '.')
+	enumNames = []
+	for i in range(size.enums):
+		enumName = cname + 'Kind{0}'.format(i)
+		enumNames.append(enumName)
+		add_typedef(typedefs, enumName, 'typedef enum _' + enumName + ' ' + enumName, 'Kinds of ' + cname + '.')
+		add_enum(enums, '_' + enumName, [enumName + v for v in ['None', 'First', 'Second', 'Third', 'Fourth']], 'Enum ' + enumName + '.')
+
+	this = cname + ' *'
+	add_function(functions, prefix + 'ref', this, [(this, 'obj')], 'Take a reference.', returnDoc='The object')
+	add_function(functions, prefix + 'unref', 'void', [(this, 'obj')], 'Release a reference.')
+	add_function(functions, prefix + 'get_user_data', 'void *', [('const ' + this, 'obj')], 'Get the user data.', returnDoc='The user data')
+	add_function(functions, prefix + 'set_user_data', 'void', [(this, 'obj'), ('void *', 'ud')], 'Set the user data.')
+	add_function(functions, prefix + 'new', this, [], 'Create a ' + cname + '.', returnDoc='A new object')
+	add_function(functions, prefix + 'get_callbacks', cname + 'Cbs *', [('const ' + this, 'obj')], 'Get the callbacks.', returnDoc='The callbacks')
+
+	argTypes = [('int', 'count'), ('const char *', 'label'), (peer + ' *', 'peer'), ('bool_t', 'enabled'), ('uint32_t', 'mask'), ('float', 'ratio')]
+	propertyTypes = ['int', 'const char *', 'bool_t', peer + ' *', 'float']
+	if len(enumNames) > 0:
+		argTypes.append((enumNames[0], 'kind'))
+		propertyTypes.append(enumNames[0])
+	returnTypes = ['void', 'int', 'const char *', 'LinphoneStatus', 'bctbx_list_t *']
+	for i in range(size.methods):
+		args = [(this, 'obj')] + argTypes[i % len(argTypes):i % len(argTypes) + 2]
+		returnType = returnTypes[i % len(returnTypes)]
+		refs = [prefix + 'do_action{0}()'.format((i + 1) % size.methods), peer]
+		add_function(functions, prefix + 'do_action{0}'.format(i), returnType, args, 'Perform action {0} on the {1}.'.format(i, cname),
+			returnDoc=None if returnType == 'void' else 'The result', containedType=peer if returnType == 'bctbx_list_t *' else None,
+			deprecated=(i % 10 == 3), paragraphs=size.paragraphs, refs=refs)
+	for i in range(size.properties):
+		propertyType = propertyTypes[i % len(propertyTypes)]
+		propertyName = 'prop{0}'.format(i)
+		add_function(functions, prefix + 'get_' + propertyName, propertyType, [('const ' + this, 'obj')], 'Get property {0}.'.format(i), returnDoc='The value', paragraphs=size.paragraphs)
+		add_function(functions, prefix + 'set_' + propertyName, 'void', [(this, 'obj'), (propertyType, 'value')], 'Set property {0}.'.format(i), paragraphs=size.paragraphs)
+	add_function(functions, prefix + 'is_ready', 'bool_t', [('const ' + this, 'obj')], 'Tell whether the object is ready.', returnDoc='TRUE if ready')
+	add_function(functions, prefix + 'enable_turbo', 'void', [(this, 'obj'), ('bool_t', 'enable')], 'Enable turbo mode.')
+	add_function(functions, prefix + 'turbo_enabled', 'bool_t', [('const ' + this, 'obj')], 'Tell whether turbo mode is enabled.', returnDoc='TRUE if enabled')
+
+	cbs = cname + 'Cbs *'
+	cbsPrefix = prefix + 'cbs_'
+	add_function(functions, cbsPrefix + 'ref', cbs, [(cbs, 'cbs')], 'Take a reference.', returnDoc='The callbacks')
+	add_function(functions, cbsPrefix + 'unref', 'void', [(cbs, 'cbs')], 'Release a reference.')
+	add_function(functions, cbsPrefix + 'get_user_data', 'void *', [('const ' + cbs, 'cbs')], 'Get the user data.', returnDoc='The user data')
+	add_function(functions, cbsPrefix + 'set_user_data', 'void', [(cbs, 'cbs'), ('void *', 'ud')], 'Set the user data.')
+	for i in range(size.callbacks):
+		callbackName = cname + 'CbsEvent{0}Cb'.format(i)
+		add_typedef(typedefs, callbackName, 'typedef void(* ' + callbackName + ')(' + this + 'obj, int value)', 'Callback of event {0}.'.format(i))
+		add_function(functions, cbsPrefix + 'get_event{0}'.format(i), callbackName, [(cbs, 'cbs')], 'Get the callback of event {0}.'.format(i), returnDoc='The callback')
+		add_function(functions, cbsPrefix + 'set_event{0}'.format(i), 'void', [(cbs, 'cbs'), (callbackName, 'cb')], 'Set the callback of event {0}.'.format(i))
+	write_xml(root, os.path.join(outdir, 'group__' + name.lower() + '.xml'))
+
+	structRoot = ET.Element('doxygen')
+	structCompounddef = ET.SubElement(structRoot, 'compounddef', {'kind': 'struct', 'prot': 'public', 'id': 'struct__' + cname.lower()})
+	ET.SubElement(structCompounddef, 'compoundname').text = '_' + cname
+	add_description(structCompounddef, 'briefdescription', 'Structure of ' + cname + '.')
+	add_description(structCompounddef, 'detaileddescription', None)
+	write_xml(structRoot, os.path.join(outdir, 'struct__' + cname.lower() + '.xml'))
+
+
+def generate(outdir, size):
+	"""Write the Doxygen XML files of a synthetic API of the given size to outdir."""
+	if not os.path.isdir(outdir):
+		os.makedirs(outdir)
+	for i in range(size.classes):
+		generate_class(outdir, i, size)
+	write_xml(ET.Element('doxygenindex'), os.path.join(outdir, 'index.xml'))
+
+
+def main(argv = None):
+	argparser = argparse.ArgumentParser(description="Generate the Doxygen XML documentation of a synthetic Linphone-like API.")
+	argparser.add_argument('--classes', type=int, default=REFERENCE_SIZE.classes, help="Number of classes (default: {0}).".format(REFERENCE_SIZE.classes))
+	argparser.add_argument('--methods', type=int, default=REFERENCE_SIZE.methods, help="Number of methods per class, besides the usual ref/unref/user data ones (default: {0}).".format(REFERENCE_SIZE.methods))
+	argparser.add_argument('--properties', type=int, default=REFERENCE_SIZE.properties, help="Number of properties per class (default: {0}).".format(REFERENCE_SIZE.properties))
+	argparser.add_argument('--callbacks', type=int, default=REFERENCE_SIZE.callbacks, help="Number of callbacks per class (default: {0}).".format(REFERENCE_SIZE.callbacks))
+	argparser.add_argument('--enums', type=int, default=REFERENCE_SIZE.enums, help="Number of enums per class (default: {0}).".format(REFERENCE_SIZE.enums))
+	argparser.add_argument('--paragraphs', type=int, default=REFERENCE_SIZE.paragraphs, help="Number of paragraphs in the detailed description of methods (default: {0}).".format(REFERENCE_SIZE.paragraphs))
+	argparser.add_argument('outdir', help="Directory where to write the XML files.")
+	args = argparser.parse_args(argv)
+	generate(args.outdir, ApiSize(args.classes, args.methods, args.properties, args.callbacks, args.enums, args.paragraphs))
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+# Usage: stage_runner.py RSSFILE SCRIPT [ARGS...]
+# Run a generator script as __main__ and write the peak resident memory of the process, in kB, to RSSFILE.
+
+import os
+import resource
+import runpy
+import sys
+
+
+def main():
+	rssfile = sys.argv[1]
+	script = os.path.abspath(sys.argv[2])
+	sys.argv = [script] + sys.argv[3:]
+	sys.path.insert(0, os.path.dirname(script))
+	status = 0
+	try:
+		runpy.run_path(script, run_name='__main__')
+	except SystemExit as e:
+		status = e.code
+	usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == 'darwin':
+		usage //= 1024
+	with open(rssfile, 'w') as f:
+		f.write(str(usage))
+	return status
+
+
+if __name__ == "__main__":
+	sys.exit(main())
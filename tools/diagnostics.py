@@ -0,0 +1,190 @@
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import collections
+import contextlib
+import logging
+import sys
+
+import profiling
+
+
+ROOT_LOGGER_NAME = 'generators'
+
+
+class BufferedStreamHandler(logging.Handler):
+	"""Write the messages to the standard output (or to a given stream) by chunks instead of line by line.
+
+	The messages of flushLevel or above are written at once, with the ones buffered before them, so that the warnings
+	and errors stay in line with the rest of the output of the program."""
+
+	def __init__(self, stream=None, bufferSize=65536, flushLevel=logging.WARNING):
+		logging.Handler.__init__(self)
+		self.stream = stream
+		self.bufferSize = bufferSize
+		self.flushLevel = flushLevel
+		self._chunks = []
+		self._size = 0
+
+	def emit(self, record):
+		try:
+			message = self.format(record) + '\n'
+		except Exception:
+			self.handleError(record)
+			return
+		self._chunks.append(message)
+		self._size += len(message)
+		if self._size >= self.bufferSize or record.levelno >= self.flushLevel:
+			self.flush()
+
+	def flush(self):
+		self.acquire()
+		try:
+			if len(self._chunks) > 0:
+				stream = self.stream if self.stream is not None else sys.stdout
+				stream.write(''.join(self._chunks))
+				stream.flush()
+				self._chunks = []
+				self._size = 0
+		finally:
+			self.release()
+
+	def close(self):
+		self.flush()
+		logging.Handler.close(self)
+
+
+class PhaseSummaryHandler(logging.Handler):
+	"""Count the messages by phase and level, and keep the first ones of each kind."""
+
+	def __init__(self, samples=5):
+		logging.Handler.__init__(self)
+		self.samples = samples
+		self.entries = collections.OrderedDict()
+
+	def emit(self, record):
+		key = (profiling.profiler.current_phase() or 'other', record.levelname)
+		entry = self.entries.get(key)
+		if entry is None:
+			entry = {'count': 0, 'samples': []}
+			self.entries[key] = entry
+		entry['count'] += 1
+		if len(entry['samples']) < self.samples:
+			entry['samples'].append(record.getMessage())
+
+
+class RecordCollector(logging.Handler):
+	"""Keep the records in memory, so that a worker process can send them back to its parent."""
+
+	def __init__(self):
+		logging.Handler.__init__(self)
+		self.records = []
+
+	def emit(self, record):
+		# Format the message now, the arguments might not be picklable
+		record.msg = record.getMessage()
+		record.args = None
+		record.exc_info = None
+		self.records.append(record)
+
+
+_output = BufferedStreamHandler()
+_output.setFormatter(logging.Formatter('%(message)s'))
+_summary = PhaseSummaryHandler()
+# Debug messages are too many to be worth summarizing
+_summary.setLevel(logging.INFO)
+_collector = None
+
+
+def get_logger(name):
+	return logging.getLogger(ROOT_LOGGER_NAME + '.' + name)
+
+
+def setup(verbose=False):
+	"""Write the messages of the generators to the standard output, including the debug ones if verbose is set.
+
+	It is called by the entry points of the generators, the messages being flushed at the boundaries of their
+	phases."""
+	logger = logging.getLogger(ROOT_LOGGER_NAME)
+	logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+	logger.propagate = False
+	for handler in [_output, _summary]:
+		if handler not in logger.handlers:
+			logger.addHandler(handler)
+	profiling.profiler.add_boundary_hook(flush)
+
+
+def setup_worker(verbose=False):
+	"""Collect the messages of a worker process instead of writing them, see take_records()."""
+	global _collector
+	logger = logging.getLogger(ROOT_LOGGER_NAME)
+	logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+	for handler in list(logger.handlers):
+		logger.removeHandler(handler)
+	_collector = RecordCollector()
+	logger.addHandler(_collector)
+
+
+@contextlib.contextmanager
+def recording(verbose=False):
+	"""Collect the messages logged in the block instead of writing them, as in a worker process. They must be taken
+	with take_records() before the end of the block."""
+	global _collector
+	logger = logging.getLogger(ROOT_LOGGER_NAME)
+	level = logger.level
+	handlers = list(logger.handlers)
+	collector = _collector
+	setup_worker(verbose)
+	try:
+		yield
+	finally:
+		logger.removeHandler(_collector)
+		for handler in handlers:
+			logger.addHandler(handler)
+		logger.setLevel(level)
+		_collector = collector
+
+
+def take_records():
+	records = _collector.records
+	_collector.records = []
+	return records
+
+
+def replay(records):
+	for record in records:
+		logger = logging.getLogger(record.name)
+		if logger.isEnabledFor(record.levelno):
+			logger.handle(record)
+
+
+def flush():
+	_output.flush()
+
+
+def summary():
+	return [collections.OrderedDict([('phase', phase), ('level', level), ('count', entry['count']), ('samples', entry['samples'])])
+		for (phase, level), entry in _summary.entries.items()]
+
+
+def log_summary():
+	logger = get_logger('summary')
+	for item in summary():
+		if item['level'] in ['DEBUG', 'INFO']:
+			continue
+		logger.info("{0} {1} message(s) during {2}, e.g.:".format(item['count'], item['level'].lower(), item['phase']))
+		for sample in item['samples']:
+			logger.info("\t" + sample.split('\n')[0])
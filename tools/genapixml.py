@@ -17,13 +17,36 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import argparse
+import collections
+import hashlib
+import multiprocessing
 import os
 import six
 import string
 import sys
 import xml.etree.ElementTree as ET
-import xml.dom.minidom as minidom
+import diagnostics
 import metadoc
+import profiling
+from six.moves import cPickle as pickle
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+
+logger = diagnostics.get_logger('genapixml')
+
+
+def peak_memory_usage():
+	"""Return the peak resident set size in kB of the process and of its terminated children, or None if unknown."""
+	if resource is None:
+		return None
+	usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+	if sys.platform == 'darwin':
+		usage //= 1024
+	return usage
 
 
 class CObject:
@@ -73,52 +96,55 @@ class CTypedef(CObject):
 		self.definition = definition.strip()
 
 
+_cTypes = {}
+
+def parse_c_type(t):
+	"""Split a C type string and return its (ctype, completeType) description.
+
+	The result only depends on the type string and is memoized."""
+	key = t.strip()
+	parsedType = _cTypes.get(key)
+	if parsedType is None:
+		parsedType = _parse_c_type(key)
+		_cTypes[key] = parsedType
+	return parsedType
+
+def _parse_c_type(t):
+	keywords = [ 'const', 'struct', 'enum', 'signed', 'unsigned', 'short', 'long', '*' ]
+	fullySplittedType = []
+	splittedType = t.split(' ')
+	for s in splittedType:
+		if s.startswith('*'):
+			fullySplittedType.append('*')
+			if len(s) > 1:
+				fullySplittedType.append(s[1:])
+		elif s.endswith('*'):
+			fullySplittedType.append(s[:-1])
+			fullySplittedType.append('*')
+		else:
+			fullySplittedType.append(s)
+	if 'MS2_DEPRECATED' in fullySplittedType:
+		fullySplittedType.remove('MS2_DEPRECATED')
+	elif 'LINPHONE_DEPRECATED' in fullySplittedType:
+		fullySplittedType.remove('LINPHONE_DEPRECATED')
+	ctype = 'int' # Default to int so that the result is correct eg. for 'unsigned short'
+	for s in fullySplittedType:
+		if not s in keywords:
+			ctype = s
+	if ctype == 'int' and 'int' not in fullySplittedType:
+		if fullySplittedType[-1] == '*':
+			fullySplittedType.insert(-1, 'int')
+		else:
+			fullySplittedType.append('int')
+	return (ctype, ' '.join(fullySplittedType))
+
+
 class CArgument(CObject):
-	def __init__(self, t, name = '', enums = [], structs = []):
+	def __init__(self, t, name = ''):
 		CObject.__init__(self, name)
 		self.description = None
 		self.containedType = None
-		keywords = [ 'const', 'struct', 'enum', 'signed', 'unsigned', 'short', 'long', '*' ]
-		fullySplittedType = []
-		splittedType = t.strip().split(' ')
-		for s in splittedType:
-			if s.startswith('*'):
-				fullySplittedType.append('*')
-				if len(s) > 1:
-					fullySplittedType.append(s[1:])
-			elif s.endswith('*'):
-				fullySplittedType.append(s[:-1])
-				fullySplittedType.append('*')
-			else:
-				fullySplittedType.append(s)
-		if 'MS2_DEPRECATED' in fullySplittedType:
-			fullySplittedType.remove('MS2_DEPRECATED')
-		elif 'LINPHONE_DEPRECATED' in fullySplittedType:
-			fullySplittedType.remove('LINPHONE_DEPRECATED')
-		isStruct = False
-		isEnum = False
-		self.ctype = 'int' # Default to int so that the result is correct eg. for 'unsigned short'
-		for s in fullySplittedType:
-			if not s in keywords:
-				self.ctype = s
-			if s == 'struct':
-				isStruct = True
-			if s == 'enum':
-				isEnum = True
-		if isStruct:
-			for st in structs:
-				if st.associatedTypedef is not None:
-					self.ctype = st.associatedTypedef.name
-		elif isEnum:
-			for e in enums:
-				if e.associatedTypedef is not None:
-					self.ctype = e.associatedTypedef.name
-		if self.ctype == 'int' and 'int' not in fullySplittedType:
-			if fullySplittedType[-1] == '*':
-				fullySplittedType.insert(-1, 'int')
-			else:
-				fullySplittedType.append('int')
-		self.completeType = ' '.join(fullySplittedType)
+		self.ctype, self.completeType = parse_c_type(t)
 
 	def __str__(self):
 		return self.completeType + " " + self.name
@@ -236,13 +262,132 @@ class CClass(CObject):
 			self.__addClassMethod(f)
 
 
+class PrefixIndex:
+	"""Find the first added object whose key is a prefix of a given name."""
+
+	def __init__(self):
+		self.__entries = {}
+		self.__keyLengths = []
+
+	def add(self, key, obj):
+		if key not in self.__entries:
+			self.__entries[key] = (len(self.__entries), obj)
+			if len(key) not in self.__keyLengths:
+				self.__keyLengths.append(len(key))
+
+	def find(self, name):
+		found = None
+		for length in self.__keyLengths:
+			if length <= len(name):
+				entry = self.__entries.get(name[0 : length])
+				if entry is not None and (found is None or entry[0] < found[0]):
+					found = entry
+		return found[1] if found is not None else None
+
+
+class ParsedFile:
+	def __init__(self, path):
+		self.path = path
+		self.enums = []
+		self.structs = []
+		self.typedefs = []
+		self.functions = []
+
+
+def _xml_file_path(f):
+	return f if isinstance(f, six.string_types) else f.name
+
+
+def _parser_digest():
+	"""Return a hash of the code that turns the XML files into a Project, so that results saved by an older version are not reused."""
+	hasher = hashlib.sha1()
+	for module in [sys.modules[__name__], metadoc]:
+		source = os.path.splitext(module.__file__)[0] + '.py'
+		if os.path.exists(source):
+			with open(source, 'rb') as f:
+				hasher.update(f.read())
+	return hasher.hexdigest()
+
+
+def directory_digest(xmldir):
+	"""Return a hash of the names and of the contents of the XML files of a directory."""
+	hasher = hashlib.sha1(_parser_digest().encode('utf-8'))
+	for f in sorted(os.listdir(xmldir)):
+		path = os.path.join(xmldir, f)
+		if os.path.isfile(path) and f.endswith('.xml'):
+			hasher.update(f.encode('utf-8') + b'\0')
+			with open(path, 'rb') as xmlfile:
+				hasher.update(hashlib.sha1(xmlfile.read()).digest())
+	return hasher.hexdigest()
+
+
+class SnapshotError(Exception):
+	pass
+
+
+class ParseCache:
+	"""On-disk cache of the records extracted from each XML file, keyed by the path and the content of the file."""
+
+	version = 1
+
+	def __init__(self, directory):
+		self.directory = directory
+		self.hits = 0
+		self.misses = 0
+		# Changes to the parsing code must invalidate the entries
+		self.parserDigest = str(ParseCache.version) + _parser_digest()
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+
+	def __entryPath(self, path):
+		key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+		return os.path.join(self.directory, key + '.pickle')
+
+	def digest(self, path):
+		hasher = hashlib.sha1(self.parserDigest.encode('utf-8'))
+		with open(path, 'rb') as f:
+			hasher.update(f.read())
+		return hasher.hexdigest()
+
+	def load(self, path, digest):
+		parsedFile = None
+		try:
+			with open(self.__entryPath(path), 'rb') as f:
+				entryDigest, entry = pickle.load(f)
+			if entryDigest == digest:
+				parsedFile = entry
+		except Exception:
+			# Missing, truncated or unreadable entries are parsed again
+			parsedFile = None
+		if parsedFile is None:
+			self.misses += 1
+		else:
+			self.hits += 1
+		return parsedFile
+
+	def store(self, path, digest, parsedFile):
+		entryPath = self.__entryPath(path)
+		tmpPath = entryPath + '.{0}.tmp'.format(os.getpid())
+		with open(tmpPath, 'wb') as f:
+			pickle.dump((digest, parsedFile), f, pickle.HIGHEST_PROTOCOL)
+		if os.path.exists(entryPath):
+			os.remove(entryPath)
+		os.rename(tmpPath, entryPath)
+
+
 class Project:
+	snapshotVersion = 3
+
 	def __init__(self):
 		self.verbose = False
 		self.prettyPrint = False
+		self.jobs = 1
+		self.streaming = False
+		self.cacheDir = None
 		self.enums = []
 		self.__structs = []
 		self.__typedefs = []
+		self.__parsedFiles = []
 		self.__events = []
 		self.__functions = []
 		self.classes = []
@@ -251,36 +396,36 @@ class Project:
 	def add(self, elem):
 		if isinstance(elem, CClass):
 			if self.verbose:
-				print("Adding class " + elem.name)
+				logger.debug("Adding class " + elem.name)
 			self.classes.append(elem)
 		elif isinstance(elem, CEnum):
 			if self.verbose:
-				print("Adding enum " + elem.name)
+				logger.debug("Adding enum " + elem.name)
 				for ev in elem.values:
-					print("\t" + ev.name)
+					logger.debug("\t" + ev.name)
 			self.enums.append(elem)
 		elif isinstance(elem, CStruct):
 			if self.verbose:
-				print("Adding struct " + elem.name)
+				logger.debug("Adding struct " + elem.name)
 				for sm in elem.members:
-					print("\t" + sm.ctype + " " + sm.name)
+					logger.debug("\t" + sm.ctype + " " + sm.name)
 			self.__structs.append(elem)
 		elif isinstance(elem, CTypedef):
 			if self.verbose:
-				print("Adding typedef " + elem.name)
-				print("\t" + elem.definition)
+				logger.debug("Adding typedef " + elem.name)
+				logger.debug("\t" + elem.definition)
 			self.__typedefs.append(elem)
 		elif isinstance(elem, CEvent):
 			if self.verbose:
-				print("Adding event " + elem.name)
-				print("\tReturns: " + elem.returnArgument.ctype)
-				print("\tArguments: " + str(elem.arguments))
+				logger.debug("Adding event " + elem.name)
+				logger.debug("\tReturns: " + elem.returnArgument.ctype)
+				logger.debug("\tArguments: " + str(elem.arguments))
 			self.__events.append(elem)
 		elif isinstance(elem, CFunction):
 			if self.verbose:
-				print("Adding function " + elem.name)
-				print("\tReturns: " + elem.returnArgument.ctype)
-				print("\tArguments: " + str(elem.arguments))
+				logger.debug("Adding function " + elem.name)
+				logger.debug("\tReturns: " + elem.returnArgument.ctype)
+				logger.debug("\tArguments: " + str(elem.arguments))
 			self.__functions.append(elem)
 
 	def __cleanDescription(self, descriptionNode):
@@ -313,34 +458,44 @@ class Project:
 	def __canBeWrapped(self, node):
 		return node.find('./detaileddescription//donotwrap') is None
 
-	def __discoverClasses(self):
+	def __linkTypedefs(self):
+		# Index the enums and structs that are waiting for a typedef by name, keeping their order of declaration
+		pendingEnums = {}
+		for e in self.enums:
+			if e.associatedTypedef is None:
+				pendingEnums.setdefault(e.name, collections.deque()).append(e)
+		pendingStructs = {}
+		for st in self.__structs:
+			if st.associatedTypedef is None:
+				pendingStructs.setdefault(st.name, collections.deque()).append(st)
 		for td in self.__typedefs:
 			if td.definition.startswith('enum '):
-				for e in self.enums:
-					if (e.associatedTypedef is None) and td.definition[5:] == e.name:
-						e.associatedTypedef = td
-						break
+				candidates = pendingEnums.get(td.definition[5:])
+				if candidates:
+					candidates.popleft().associatedTypedef = td
 			elif td.definition.startswith('struct '):
-				structFound = False
-				for st in self.__structs:
-					if (st.associatedTypedef is None) and td.definition[7:] == st.name:
-						st.associatedTypedef = td
-						structFound = True
-						break
-				if not structFound:
+				candidates = pendingStructs.get(td.definition[7:])
+				if candidates:
+					candidates.popleft().associatedTypedef = td
+				else:
 					name = td.definition[7:]
-					print("Structure with no associated typedef: " + name)
+					logger.warning("Structure with no associated typedef: " + name)
 					st = CStruct(name)
 					st.associatedTypedef = td
 					self.add(st)
+
+	def __discoverClasses(self):
+		structsByTypedef = {}
+		for st in self.__structs:
+			if st.associatedTypedef is not None:
+				structsByTypedef.setdefault(id(st.associatedTypedef), st)
 		for td in self.__typedefs:
 			if td.definition.startswith('struct '):
-				for st in self.__structs:
-					if st.associatedTypedef == td:
-						cclass = CClass(st)
-						cclass.briefDoc = td.briefDoc
-						self.add(cclass)
-						break
+				st = structsByTypedef.get(id(td))
+				if st is not None:
+					cclass = CClass(st)
+					cclass.briefDoc = td.briefDoc
+					self.add(cclass)
 			elif ('Linphone' + td.definition) == td.name:
 				st = CStruct(td.name)
 				st.associatedTypedef = td
@@ -350,24 +505,24 @@ class Project:
 				self.add(cclass)
 		# Sort classes by length of name (longest first), so that methods are put in the right class
 		self.classes.sort(key = lambda c: len(c.name), reverse = True)
+		cbsClassesIndex = PrefixIndex()
+		classesIndex = PrefixIndex()
+		functionPrefixesIndex = PrefixIndex()
+		for c in self.classes:
+			if c.name.endswith('Cbs'):
+				cbsClassesIndex.add(c.name, c)
+			classesIndex.add(c.name, c)
+			functionPrefixesIndex.add(c.cFunctionPrefix, c)
 		for e in self.__events:
-			eventAdded = False
-			for c in self.classes:
-				if c.name.endswith('Cbs') and e.name.startswith(c.name):
-					c.addEvent(e)
-					eventAdded = True
-					break
-			if not eventAdded:
-				for c in self.classes:
-					if e.name.startswith(c.name):
-						c.addEvent(e)
-						eventAdded = True
-						break
+			c = cbsClassesIndex.find(e.name)
+			if c is None:
+				c = classesIndex.find(e.name)
+			if c is not None:
+				c.addEvent(e)
 		for f in self.__functions:
-			for c in self.classes:
-				if c.cFunctionPrefix == f.name[0 : len(c.cFunctionPrefix)]:
-					c.addMethod(f)
-					break
+			c = functionPrefixesIndex.find(f.name)
+			if c is not None:
+				c.addMethod(f)
 
 	def __parseCEnumValueInitializer(self, initializer):
 		initializer = initializer.strip()
@@ -409,10 +564,13 @@ class Project:
 		return e
 
 	def __findCEnum(self, tree):
+		enums = []
 		memberdefs = tree.findall("./compounddef[@kind='group']/sectiondef[@kind='enum']/memberdef[@kind='enum'][@prot='public']")
 		for m in memberdefs:
 			e = self.__parseCEnumMemberdef(m)
-			self.add(e)
+			if e is not None:
+				enums.append(e)
+		return enums
 
 	def __parseCStructMember(self, node, structname):
 		name = node.find('./name').text
@@ -442,10 +600,12 @@ class Project:
 		return s
 
 	def __findCStruct(self, tree):
+		structs = []
 		compounddefs = tree.findall("./compounddef[@kind='struct'][@prot='public']")
 		for c in compounddefs:
 			s = self.__parseCStructCompounddef(c)
-			self.add(s)
+			structs.append(s)
+		return structs
 
 	def __parseCTypedefMemberdef(self, node):
 		if not Project.__canBeWrapped(self, node):
@@ -459,7 +619,7 @@ class Project:
 			if pos == -1:
 				return None
 			returntype = definition[0:pos].strip()
-			returnarg = CArgument(returntype, enums = self.enums, structs = self.__structs)
+			returnarg = CArgument(returntype)
 			returndesc = node.find("./detaileddescription/para/simplesect[@kind='return']")
 			if returndesc is not None:
 				if returnarg.ctype == 'MSList' or returnarg.ctype == 'bctbx_list_t':
@@ -483,7 +643,7 @@ class Project:
 				elif spacePos != -1:
 					argType = argdef[0 : spacePos]
 					argName = argdef[spacePos + 1 :]
-				argslist.addArgument(CArgument(argType, argName, self.enums, self.__structs))
+				argslist.addArgument(CArgument(argType, argName))
 			if len(argslist) > 0:
 				paramdescs = node.findall("detaileddescription/para/parameterlist[@kind='param']/parameteritem")
 				if paramdescs:
@@ -496,7 +656,7 @@ class Project:
 						if arg.description == None:
 							missingDocWarning += "\t'" + arg.name + "' parameter not documented\n";
 					if missingDocWarning != '':
-						print(name + ":\n" + missingDocWarning)
+						logger.warning(name + ":\n" + missingDocWarning)
 			f = CEvent(name, returnarg, argslist)
 			deprecatedNode = node.find(".//xrefsect[xreftitle='Deprecated']")
 			if deprecatedNode is not None:
@@ -520,10 +680,13 @@ class Project:
 		return None
 
 	def __findCTypedef(self, tree):
+		typedefs = []
 		memberdefs = tree.findall("./compounddef[@kind='group']/sectiondef[@kind='typedef']/memberdef[@kind='typedef'][@prot='public']")
 		for m in memberdefs:
 			td = self.__parseCTypedefMemberdef(m)
-			self.add(td)
+			if td is not None:
+				typedefs.append(td)
+		return typedefs
 
 	def __parseCFunctionMemberdef(self, node):
 		if not Project.__canBeWrapped(self, node):
@@ -534,7 +697,7 @@ class Project:
 		missingDocWarning = ''
 		name = node.find('./name').text
 		t = ''.join(node.find('./type').itertext())
-		returnarg = CArgument(t, enums = self.enums, structs = self.__structs)
+		returnarg = CArgument(t)
 		returndesc = node.find("./detaileddescription/para/simplesect[@kind='return']")
 		if returndesc is not None:
 			if returnarg.ctype == 'MSList' or returnarg.ctype == 'bctbx_list_t':
@@ -553,7 +716,7 @@ class Project:
 			if argNameNode is not None:
 				argName = ''.join(argNameNode.itertext())
 			if argType != 'void':
-				argslist.addArgument(CArgument(argType, argName, self.enums, self.__structs))
+				argslist.addArgument(CArgument(argType, argName))
 		if len(argslist) > 0:
 			paramdescs = node.findall("./detaileddescription/para/parameterlist[@kind='param']/parameteritem")
 			if paramdescs:
@@ -584,58 +747,322 @@ class Project:
 			if not f.location.endswith('.h'):
 				missingDocWarning += "\tNot documented in a header file ('" + f.location + "')\n";
 		if missingDocWarning != '':
-			print(name + ":\n" + missingDocWarning)
+			logger.warning(name + ":\n" + missingDocWarning)
 		return f
 
 	def __findCFunction(self, tree):
+		functions = []
 		memberdefs = tree.findall("./compounddef[@kind='group']/sectiondef[@kind='func']/memberdef[@kind='function'][@prot='public'][@static='no']")
 		for m in memberdefs:
 			f = self.__parseCFunctionMemberdef(m)
 			if f is not None:
-				self.add(f)
+				functions.append(f)
+		return functions
+
+	def __parseStreamedMemberdef(self, sectionKind, node, parsedFile):
+		kind = node.get('kind')
+		if sectionKind == 'enum' and kind == 'enum':
+			e = self.__parseCEnumMemberdef(node)
+			if e is not None:
+				parsedFile.enums.append(e)
+		elif sectionKind == 'typedef' and kind == 'typedef':
+			td = self.__parseCTypedefMemberdef(node)
+			if td is not None:
+				parsedFile.typedefs.append(td)
+		elif sectionKind == 'func' and kind == 'function' and node.get('static') == 'no':
+			f = self.__parseCFunctionMemberdef(node)
+			if f is not None:
+				parsedFile.functions.append(f)
+
+	def __streamFile(self, f, parsedFile):
+		# The C objects only keep the description elements, which do not reference their parents. So each memberdef
+		# and compounddef can be dropped from the document as soon as it has been parsed.
+		ancestors = []
+		for event, node in ET.iterparse(f, events=('start', 'end')):
+			if event == 'start':
+				ancestors.append(node)
+				continue
+			ancestors.pop()
+			if node.tag == 'memberdef' and len(ancestors) == 3:
+				compounddef, sectiondef = ancestors[1], ancestors[2]
+				if compounddef.get('kind') == 'group' and node.get('prot') == 'public':
+					self.__parseStreamedMemberdef(sectiondef.get('kind'), node, parsedFile)
+				if compounddef.get('kind') != 'struct':
+					sectiondef.remove(node)
+			elif node.tag == 'compounddef' and len(ancestors) == 1:
+				if node.get('kind') == 'struct' and node.get('prot') == 'public':
+					parsedFile.structs.append(self.__parseCStructCompounddef(node))
+				ancestors[0].remove(node)
+
+	def parseFile(self, f):
+		parsedFile = None
+		path = _xml_file_path(f)
+		try:
+			if self.verbose:
+				logger.debug("Parsing XML file: " + path)
+			if self.streaming:
+				parsedFile = ParsedFile(path)
+				self.__streamFile(f, parsedFile)
+			else:
+				tree = ET.parse(f)
+				parsedFile = ParsedFile(path)
+				parsedFile.enums = self.__findCEnum(tree)
+				parsedFile.structs = self.__findCStruct(tree)
+				parsedFile.typedefs = self.__findCTypedef(tree)
+				parsedFile.functions = self.__findCFunction(tree)
+		except ET.ParseError as e:
+			logger.error(str(e))
+			parsedFile = None
+		return parsedFile
+
+	def __parseFilesInParallel(self, xmlfiles):
+		paths = [_xml_file_path(f) for f in xmlfiles]
+		# Do not let the workers inherit pending messages
+		diagnostics.flush()
+		pool = multiprocessing.Pool(self.jobs, _init_parsing_worker, (self.verbose, self.streaming))
+		try:
+			results = pool.map(_parse_file_in_worker, paths, max(1, len(paths) // (self.jobs * 4)))
+		finally:
+			pool.close()
+			pool.join()
+		# Messages of the workers are output in the order of the files, as in a serial run
+		parsedFiles = []
+		for parsedFile, records in results:
+			diagnostics.replay(records)
+			parsedFiles.append(parsedFile)
+		return parsedFiles
+
+	def __parseFiles(self, xmlfiles):
+		parsedFiles = [None] * len(xmlfiles)
+		digests = [None] * len(xmlfiles)
+		cache = None
+		if self.cacheDir is not None:
+			cache = ParseCache(self.cacheDir)
+			for i, f in enumerate(xmlfiles):
+				digests[i] = cache.digest(_xml_file_path(f))
+				parsedFiles[i] = cache.load(_xml_file_path(f), digests[i])
+		outdated = [i for i in range(len(xmlfiles)) if parsedFiles[i] is None]
+		if self.jobs > 1 and len(outdated) > 1:
+			results = self.__parseFilesInParallel([xmlfiles[i] for i in outdated])
+		else:
+			results = [self.parseFile(xmlfiles[i]) for i in outdated]
+		for i, parsedFile in zip(outdated, results):
+			parsedFiles[i] = parsedFile
+			if cache is not None and parsedFile is not None:
+				cache.store(_xml_file_path(xmlfiles[i]), digests[i], parsedFile)
+		if self.verbose and cache is not None:
+			logger.debug("Parse cache: {0} files reused, {1} files parsed".format(cache.hits, cache.misses))
+		return [pf for pf in parsedFiles if pf is not None]
 
 	def initFromFiles(self, xmlfiles):
-		trees = []
-		for f in xmlfiles:
-			tree = None
-			try:
-				if self.verbose:
-					print("Parsing XML file: " + f.name)
-				tree = ET.parse(f)
-			except ET.ParseError as e:
-				print(e)
-			if tree is not None:
-				trees.append(tree)
-		for tree in trees:
-			self.__findCEnum(tree)
-		for tree in trees:
-			self.__findCStruct(tree)
-		for tree in trees:
-			self.__findCTypedef(tree)
-		for tree in trees:
-			self.__findCFunction(tree)
-		self.__discoverClasses()
+		with profiling.phase('file parse'):
+			parsedFiles = self.__parseFiles(xmlfiles)
+		self.initFromParsedFiles(parsedFiles)
+		if self.verbose and peak_memory_usage() is not None:
+			logger.debug("Peak memory usage after parsing: {0} kB".format(peak_memory_usage()))
+
+	def initFromParsedFiles(self, parsedFiles):
+		self.__parsedFiles = parsedFiles
+		# Merge in file order and pass by pass so that the result does not depend on the number of jobs
+		for pf in parsedFiles:
+			for e in pf.enums:
+				self.add(e)
+		for pf in parsedFiles:
+			for s in pf.structs:
+				self.add(s)
+		for pf in parsedFiles:
+			for td in pf.typedefs:
+				self.add(td)
+		for pf in parsedFiles:
+			for f in pf.functions:
+				self.add(f)
+		with profiling.phase('typedef linking'):
+			self.__linkTypedefs()
+		with profiling.phase('class discovery'):
+			self.__discoverClasses()
 
 	def initFromDir(self, xmldir):
 		files = [ os.path.join(xmldir, f) for f in os.listdir(xmldir) if (os.path.isfile(os.path.join(xmldir, f)) and f.endswith('.xml')) ]
 		self.initFromFiles(files)
 
+	def saveSnapshot(self, path, xmldir):
+		# The header is pickled on its own so that it can be checked even if the classes of the project changed
+		payload = pickle.dumps(self.__parsedFiles, pickle.HIGHEST_PROTOCOL)
+		snapshot = (Project.snapshotVersion, os.path.abspath(xmldir), directory_digest(xmldir), payload)
+		tmpPath = path + '.{0}.tmp'.format(os.getpid())
+		with open(tmpPath, 'wb') as f:
+			pickle.dump(snapshot, f, pickle.HIGHEST_PROTOCOL)
+		if os.path.exists(path):
+			os.remove(path)
+		os.rename(tmpPath, path)
+		if self.verbose:
+			logger.debug("Saved snapshot of the API to '" + path + "'")
+
+	def initFromSnapshot(self, path, xmldir = None):
+		try:
+			with open(path, 'rb') as f:
+				version, snapshotXmldir, digest, payload = pickle.load(f)
+		except Exception as e:
+			if xmldir is None or not os.path.isdir(xmldir):
+				raise SnapshotError("Cannot read snapshot '{0}': {1}".format(path, e))
+			version, snapshotXmldir, digest, payload = None, xmldir, None, None
+		if xmldir is None:
+			xmldir = snapshotXmldir
+		if not os.path.isdir(xmldir):
+			if version != Project.snapshotVersion:
+				raise SnapshotError("Snapshot '{0}' has version {1} instead of {2}".format(path, version, Project.snapshotVersion))
+			logger.warning("Warning: cannot check whether snapshot '" + path + "' is up to date, '" + xmldir + "' is missing")
+		elif version != Project.snapshotVersion or digest != directory_digest(xmldir):
+			# The snapshot is outdated, parse the XML directory again and replace it
+			if self.verbose:
+				logger.debug("Snapshot '" + path + "' is outdated, parsing '" + xmldir + "'")
+			self.initFromDir(xmldir)
+			self.saveSnapshot(path, xmldir)
+			return
+		if self.verbose:
+			logger.debug("Loading snapshot of the API from '" + path + "'")
+		with profiling.phase('file parse'):
+			parsedFiles = pickle.loads(payload)
+		# The typedefs of the enums and structs were associated by the class discovery that preceded the save,
+		# forget them so that discovery builds exactly the same project again
+		for parsedFile in parsedFiles:
+			for elem in parsedFile.enums + parsedFile.structs:
+				elem.associatedTypedef = None
+		self.initFromParsedFiles(parsedFiles)
+
+	def initFromDirOrSnapshot(self, path):
+		if os.path.isdir(path):
+			self.initFromDir(path)
+		else:
+			self.initFromSnapshot(path)
+
 	def check(self):
 		for c in self.classes:
 			for name, p in six.iteritems(c.properties):
 				if p.getter is None and p.setter is not None:
-					print("Property '" + name + "' of class '" + c.name + "' has a setter but no getter")
+					logger.warning("Property '" + name + "' of class '" + c.name + "' has a setter but no getter")
+
+
+_workerProject = None
+
+def _init_parsing_worker(verbose, streaming):
+	global _workerProject
+	diagnostics.setup_worker(verbose)
+	_workerProject = Project()
+	_workerProject.verbose = verbose
+	_workerProject.streaming = streaming
+
+def _parse_file_in_worker(path):
+	parsedFile = _workerProject.parseFile(path)
+	return (parsedFile, diagnostics.take_records())
+
+
+class XmlWriter:
+	"""Write an XML document incrementally, each ElementTree subtree being serialized as soon as it is complete.
+
+	With indentation, the layout is the one of minidom's toprettyxml()."""
+
+	def __init__(self, outputfile, indent = None):
+		self.__outputfile = outputfile
+		self.__indent = indent
+		self.__depth = 0
+		self.__pendingStartTag = None
+
+	def __write(self, s):
+		if six.PY2 and isinstance(s, six.text_type):
+			s = s.encode('utf-8')
+		self.__outputfile.write(s)
+
+	@staticmethod
+	def __escape(data):
+		return data.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+	@staticmethod
+	def __attributes(node):
+		# Same attribute order as ElementTree serialization
+		items = node.items()
+		if six.PY2:
+			items = sorted(items)
+		return items
+
+	def __flushStartTag(self):
+		if self.__pendingStartTag is not None:
+			if self.__indent is None:
+				self.__write(self.__pendingStartTag + '>')
+			else:
+				self.__write(self.__pendingStartTag + '>\n')
+			self.__pendingStartTag = None
+
+	def __prettyElement(self, node, indent, chunks):
+		chunks.append(indent + '<' + node.tag)
+		for name, value in self.__attributes(node):
+			chunks.append(' ' + name + '="' + self.__escape(value) + '"')
+		children = list(node)
+		if len(children) == 0 and not node.text:
+			chunks.append('/>\n')
+		elif len(children) == 0:
+			chunks.append('>' + self.__escape(node.text) + '</' + node.tag + '>\n')
+		else:
+			chunks.append('>\n')
+			childIndent = indent + self.__indent
+			if node.text:
+				chunks.append(self.__escape(childIndent + node.text + '\n'))
+			for child in children:
+				self.__prettyElement(child, childIndent, chunks)
+				if child.tail:
+					chunks.append(self.__escape(childIndent + child.tail + '\n'))
+			chunks.append(indent + '</' + node.tag + '>\n')
+
+	def startDocument(self):
+		if self.__indent is None:
+			self.__write('<?xml version="1.0" encoding="UTF-8" ?>\n')
+		else:
+			self.__write('<?xml version="1.0" ?>\n')
+
+	def startElement(self, tag):
+		self.__flushStartTag()
+		self.__pendingStartTag = (self.__indent or '') * self.__depth + '<' + tag
+		self.__depth += 1
+
+	def endElement(self, tag):
+		self.__depth -= 1
+		if self.__indent is None:
+			if self.__pendingStartTag is not None:
+				self.__write(self.__pendingStartTag + ' />')
+			else:
+				self.__write('</' + tag + '>')
+		else:
+			if self.__pendingStartTag is not None:
+				self.__write(self.__pendingStartTag + '/>\n')
+			else:
+				self.__write(self.__indent * self.__depth + '</' + tag + '>\n')
+		self.__pendingStartTag = None
+
+	def writeElement(self, node):
+		self.__flushStartTag()
+		if self.__indent is None:
+			s = ET.tostring(node, 'utf-8')
+			if not isinstance(s, str):
+				s = s.decode('utf-8')
+			self.__write(s)
+		else:
+			chunks = []
+			self.__prettyElement(node, self.__indent * self.__depth, chunks)
+			self.__write(''.join(chunks))
+
+	def endDocument(self):
+		self.__outputfile.flush()
 
 
 class Generator:
 	def __init__(self, outputfile):
 		self.__outputfile = outputfile
 
-	def __generateEnum(self, cenum, enumsNode):
+	def __generateEnum(self, cenum):
 		enumNodeAttributes = { 'name' : cenum.name, 'deprecated' : str(cenum.deprecated).lower() }
 		if cenum.associatedTypedef is not None:
 			enumNodeAttributes['name'] = cenum.associatedTypedef.name
-		enumNode = ET.SubElement(enumsNode, 'enum', enumNodeAttributes)
+		enumNode = ET.Element('enum', enumNodeAttributes)
 		if cenum.briefDescription != '':
 			enumBriefDescriptionNode = ET.SubElement(enumNode, 'briefdescription')
 			enumBriefDescriptionNode.text = cenum.briefDescription
@@ -649,6 +1076,7 @@ class Generator:
 					valueBriefDescriptionNode = ET.SubElement(valueNode, 'briefdescription')
 					valueBriefDescriptionNode.text = value.briefDescription
 				valueNode.append(value.detailedDescription)
+		return enumNode
 
 	def __generateFunction(self, parentNode, nodeName, f):
 		functionAttributes = { 'name' : f.name, 'deprecated' : str(f.deprecated).lower() }
@@ -674,11 +1102,11 @@ class Generator:
 			functionBriefDescriptionNode.text = f.briefDescription
 		functionNode.append(f.detailedDescription)
 
-	def __generateClass(self, cclass, classesNode):
+	def __generateClass(self, cclass):
 		# Do not include classes that contain nothing
 		if len(cclass.events) == 0 and len(cclass.classMethods) == 0 and \
 			len(cclass.instanceMethods) == 0 and len(cclass.properties) == 0:
-			return
+			return None
 		# Check the capabilities of the class
 		has_ref_method = False
 		has_unref_method = False
@@ -705,7 +1133,7 @@ class Generator:
 			'destroyable' : str(destroyable).lower()
 		}
 		# Generate the XML node for the class
-		classNode = ET.SubElement(classesNode, 'class', classNodeAttributes)
+		classNode = ET.Element('class', classNodeAttributes)
 		if len(cclass.events) > 0:
 			eventsNode = ET.SubElement(classNode, 'events')
 			eventnames = []
@@ -747,25 +1175,32 @@ class Generator:
 			classBriefDescriptionNode = ET.SubElement(classNode, 'briefdescription')
 			classBriefDescriptionNode.text = cclass.briefDescription
 		classNode.append(cclass.detailedDescription)
+		return classNode
 
 	def generate(self, project):
-		print("Generating XML document of Linphone API to '" + self.__outputfile.name + "'")
-		apiNode = ET.Element('api')
-		project.enums.sort(key = lambda e: e.name)
+		logger.info("Generating XML document of Linphone API to '" + self.__outputfile.name + "'")
+		with profiling.phase('file writes'):
+			self.__write(project)
+
+	def __write(self, project):
+		writer = XmlWriter(self.__outputfile, '\t' if project.prettyPrint else None)
+		writer.startDocument()
+		writer.startElement('api')
+		# Sorted copies, the order of the project is the one of the wrapper generators
 		if len(project.enums) > 0:
-			enumsNode = ET.SubElement(apiNode, 'enums')
-			for cenum in project.enums:
-				self.__generateEnum(cenum, enumsNode)
+			writer.startElement('enums')
+			for cenum in sorted(project.enums, key = lambda e: e.name):
+				writer.writeElement(self.__generateEnum(cenum))
+			writer.endElement('enums')
 		if len(project.classes) > 0:
-			classesNode = ET.SubElement(apiNode, 'classes')
-			project.classes.sort(key = lambda c: c.name)
-			for cclass in project.classes:
-				self.__generateClass(cclass, classesNode)
-		s = '<?xml version="1.0" encoding="UTF-8" ?>\n'.encode('utf-8')
-		s += ET.tostring(apiNode, 'utf-8')
-		if project.prettyPrint:
-			s = minidom.parseString(s).toprettyxml(indent='\t')
-		self.__outputfile.write(s)
+			writer.startElement('classes')
+			for cclass in sorted(project.classes, key = lambda c: c.name):
+				classNode = self.__generateClass(cclass)
+				if classNode is not None:
+					writer.writeElement(classNode)
+			writer.endElement('classes')
+		writer.endElement('api')
+		writer.endDocument()
 
 
 
@@ -776,8 +1211,16 @@ def main(argv = None):
 	argparser.add_argument('-o', '--outputfile', metavar='outputfile', type=argparse.FileType('w'), help="Output XML file describing the Linphone API.")
 	argparser.add_argument('--verbose', help="Increase output verbosity", action='store_true')
 	argparser.add_argument('--pretty', help="XML pretty print", action='store_true')
+	argparser.add_argument('--stream', help="Parse the XML files incrementally to reduce memory usage", action='store_true')
+	argparser.add_argument('-j', '--jobs', metavar='N', type=int, default=1, help="Number of processes used to parse the XML files (default: 1).")
+	argparser.add_argument('--snapshot', metavar='FILE', help="Snapshot file of the parsed API. It is used instead of parsing the XML directory when it is up to date and written otherwise. The wrapper generators accept it in place of the XML directory.")
+	argparser.add_argument('--cache-dir', metavar='DIR', help="Directory where the records extracted from each XML file are cached, so that only modified files are parsed again.")
+	argparser.add_argument('--profile-json', metavar='PATH', help="Write the time and memory used by each phase of the generation to a JSON file.")
 	argparser.add_argument('xmldir', help="XML directory generated by doxygen.")
 	args = argparser.parse_args()
+	diagnostics.setup(verbose=args.verbose)
+	if args.profile_json is not None:
+		profiling.profiler.start_tracing()
 	if args.outputfile == None:
 		args.outputfile = open('api.xml', 'w')
 	project = Project()
@@ -785,10 +1228,27 @@ def main(argv = None):
 		project.verbose = True
 	if args.pretty:
 		project.prettyPrint = True
-	project.initFromDir(args.xmldir)
+	project.jobs = args.jobs
+	project.streaming = args.stream
+	project.cacheDir = args.cache_dir
+	if args.snapshot is not None and os.path.exists(args.snapshot):
+		project.initFromSnapshot(args.snapshot, args.xmldir)
+	else:
+		project.initFromDir(args.xmldir)
+		if args.snapshot is not None:
+			project.saveSnapshot(args.snapshot, args.xmldir)
 	project.check()
 	gen = Generator(args.outputfile)
 	gen.generate(project)
+	if project.verbose and peak_memory_usage() is not None:
+		logger.debug("Peak memory usage: {0} kB".format(peak_memory_usage()))
+	if project.verbose:
+		diagnostics.log_summary()
+	if args.profile_json is not None:
+		profiling.profiler.dump(args.profile_json, diagnostics=diagnostics.summary())
 
 if __name__ == "__main__":
-	sys.exit(main())
+	# Run from the genapixml module rather than __main__, so that the pickled
+	# parse cache and snapshots can be loaded by the wrapper generators
+	import genapixml
+	sys.exit(genapixml.main())
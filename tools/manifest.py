@@ -0,0 +1,118 @@
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import hashlib
+import json
+import os
+
+
+def normalize_newlines(content):
+	"""Convert the line endings as reading a file in universal newlines mode would."""
+	return content.replace('\r\n', '\n').replace('\r', '\n')
+
+
+class Manifest(object):
+	"""Hashes of the files generated in a directory, so that the files whose content did not change are not written
+	again and keep their modification time.
+
+	A file is only skipped if it has not been modified since it was recorded. Files missing from the manifest are
+	compared with the content to write.
+
+	The manifest also keeps the fingerprints of what the files were generated from, so that the next run can tell
+	which of them are outdated. It is only saved once all the files have been written."""
+
+	version = 1
+
+	def __init__(self, directory, name='.genwrapper-manifest.json'):
+		self.directory = directory
+		self.path = os.path.join(directory, name)
+		self.entries = {}
+		self.fingerprints = None
+		self.written = 0
+		self.skipped = 0
+		self._modified = False
+		try:
+			with open(self.path) as f:
+				content = json.load(f)
+			if content.get('version') == Manifest.version:
+				self.entries = content['files']
+				self.fingerprints = content.get('fingerprints')
+		except Exception:
+			# Missing or unreadable manifests are written again
+			self.entries = {}
+			self.fingerprints = None
+
+	def _key(self, path):
+		return os.path.relpath(os.path.abspath(path), os.path.abspath(self.directory)).replace(os.sep, '/')
+
+	def _stat(self, path):
+		try:
+			stat = os.stat(path)
+		except OSError:
+			return None
+		return [stat.st_size, stat.st_mtime]
+
+	def _digest(self, content):
+		data = content.encode('utf-8') if not isinstance(content, bytes) else content
+		return hashlib.sha1(data).hexdigest()
+
+	def _unchanged(self, path, key, digest):
+		stat = self._stat(path)
+		if stat is None:
+			return False
+		entry = self.entries.get(key)
+		if entry is not None and entry['stat'] == stat:
+			return entry['sha1'] == digest
+		with open(path) as f:
+			return self._digest(f.read()) == digest
+
+	def recorded(self, path):
+		"""Return whether a file has been recorded and not modified since."""
+		entry = self.entries.get(self._key(path))
+		return entry is not None and entry['stat'] == self._stat(path)
+
+	def set_fingerprints(self, fingerprints):
+		if fingerprints != self.fingerprints:
+			self.fingerprints = fingerprints
+			self._modified = True
+
+	def write(self, path, content):
+		"""Write a file if its content changed, and return whether it has been written."""
+		key = self._key(path)
+		digest = self._digest(content)
+		written = not self._unchanged(path, key, digest)
+		if written:
+			with open(path, mode='w') as f:
+				f.write(content)
+			self.written += 1
+		else:
+			self.skipped += 1
+		entry = {'sha1': digest, 'stat': self._stat(path)}
+		if self.entries.get(key) != entry:
+			self.entries[key] = entry
+			self._modified = True
+		return written
+
+	def save(self):
+		if not self._modified:
+			return
+		tmpPath = self.path + '.{0}.tmp'.format(os.getpid())
+		with open(tmpPath, 'w') as f:
+			json.dump({'version': Manifest.version, 'files': self.entries, 'fingerprints': self.fingerprints}, f, indent=1, separators=(',', ': '), sort_keys=True)
+			f.write('\n')
+		if os.path.exists(self.path):
+			os.remove(self.path)
+		os.rename(tmpPath, self.path)
@@ -17,6 +17,10 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import abstractapi
+import diagnostics
+
+
+logger = diagnostics.get_logger('metadoc')
 
 
 class Nil:
@@ -26,23 +30,37 @@ class Nil:
 class Reference:
 	def __init__(self, cname):
 		self.cname = cname
-		self.relatedObject = None
+		# Related objects by API, the same description being translated for
+		# parsers with different blacklists, see CParser.restricted()
+		self._relatedObjects = {}
+	
+	def resolve(self, api):
+		relatedObject = self._relatedObjects.get(api, Nil)
+		if relatedObject is Nil:
+			try:
+				relatedObject = self._find_related_object(api)
+			except KeyError:
+				# Reported all at once by api.report_unresolved_references()
+				api.unresolvedReferences[self.cname] = None
+				relatedObject = None
+			self._relatedObjects[api] = relatedObject
+		return relatedObject
+	
+	# The related objects belong to the APIs the reference has been resolved in
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state['_relatedObjects'] = {}
+		return state
 
 
 class ClassReference(Reference):
-	def resolve(self, api):
-		try:
-			self.relatedObject = api.classesIndex[self.cname]
-		except KeyError:
-			print('doc reference pointing on an unknown object ({0})'.format(self.cname))
+	def _find_related_object(self, api):
+		return api.classesIndex[self.cname]
 
 
 class FunctionReference(Reference):
-	def resolve(self, api):
-		try:
-			self.relatedObject = api.methodsIndex[self.cname]
-		except KeyError:
-			print('doc reference pointing on an unknown object ({0})'.format(self.cname))
+	def _find_related_object(self, api):
+		return api.methodsIndex[self.cname]
 
 
 class Paragraph:
@@ -58,10 +76,17 @@ class Paragraph:
 class Description:
 	def __init__(self):
 		self.paragraphs = []
+		# API the references are looked for in, when translated
+		self.api = None
 	
 	def resolve_all_references(self, api):
 		for paragraph in self.paragraphs:
 			paragraph.resolve_all_references(api)
+	
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state['api'] = None
+		return state
 
 
 class Parser:
@@ -102,18 +127,35 @@ class Parser:
 
 
 class Translator:
-	def __init__(self):
+	def __init__(self, api=None):
 		self.textWidth = 80
+		# API the references are looked for in instead of the one of the
+		# descriptions, which is shared by the parsers restricted from it
+		self.api = api
+		# Translations by description identity. The descriptions are kept as
+		# well, so that their identity is not reused by another one.
+		self._translations = {}
 	
 	def translate(self, description):
 		if description is None:
 			return None
 		
+		key = (id(description), type(self), self.textWidth)
+		translation = self._translations.get(key)
+		if translation is None:
+			translation = (description, self._translate_description(description))
+			self._translations[key] = translation
+		return translation[1]
+	
+	def _translate_description(self, description):
+		api = description.api
+		if api is not None and self.api is not None:
+			api = self.api
 		lines = []
 		for para in description.paragraphs:
 			if para is not description.paragraphs[0]:
 				lines.append('')
-			lines.append(self._translate_paragraph(para))
+			lines.append(self._translate_paragraph(para, api))
 		
 		self._tag_as_brief(lines)
 		lines = self._crop_text(lines, self.textWidth)
@@ -124,23 +166,24 @@ class Translator:
 			
 		return translatedDoc
 	
-	def _translate_paragraph(self, para):
+	def _translate_paragraph(self, para, api=None):
 		strPara = ''
 		for part in para.parts:
 			if isinstance(part, str):
 				strPara += part
 			elif isinstance(part, Reference):
+				relatedObject = part.resolve(api) if api is not None else None
 				try:
-					strPara += self._translate_reference(part)
+					strPara += self._translate_reference(part, relatedObject)
 				except ReferenceTranslationError as e:
-					print('could not translate one reference in docstrings ({0})'.format(e.args[0]))
-					strPara += Translator._translate_reference(self, part)
+					logger.warning('could not translate one reference in docstrings ({0})'.format(e.args[0]))
+					strPara += Translator._translate_reference(self, part, relatedObject)
 			else:
 				raise TypeError('untranslatable paragraph element ({0})'.format(part))
 		
 		return strPara
 	
-	def _translate_reference(self, ref):
+	def _translate_reference(self, ref, relatedObject):
 		if isinstance(ref, FunctionReference):
 			return ref.cname + '()'
 		else:
@@ -154,17 +197,17 @@ class Translator:
 	
 	def _split_line(self, line, width):
 		lines = []
-		while len(line) > width:
-			cutIndex = line.rfind(' ', 0, width)
+		start = 0
+		while len(line) - start > width:
+			cutIndex = line.rfind(' ', start, start + width)
 			if cutIndex != -1:
-				lines.append(line[0:cutIndex])
-				line = line[cutIndex+1:]
+				lines.append(line[start:cutIndex])
+				start = cutIndex + 1
 			else:
-				cutIndex = width
-				lines.append(line[0:cutIndex])
-				line = line[cutIndex:]
+				lines.append(line[start:start + width])
+				start += width
 		
-		lines.append(line)
+		lines.append(line[start:])
 		return lines
 
 
@@ -177,11 +220,11 @@ class DoxygenCppTranslator(Translator):
 		if len(lines) > 0:
 			lines[0] = '@brief ' + lines[0]
 	
-	def _translate_reference(self, ref):
-		if isinstance(ref.relatedObject, (abstractapi.Class, abstractapi.Enum)):
-			return '#' + ref.relatedObject.name.to_c()
-		elif isinstance(ref.relatedObject, abstractapi.Method):
-			return ref.relatedObject.name.to_c() + '()'
+	def _translate_reference(self, ref, relatedObject):
+		if isinstance(relatedObject, (abstractapi.Class, abstractapi.Enum)):
+			return '#' + relatedObject.name.to_c()
+		elif isinstance(relatedObject, abstractapi.Method):
+			return relatedObject.name.to_c() + '()'
 		else:
 			raise ReferenceTranslationError(ref.cname)
 
@@ -0,0 +1,141 @@
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import collections
+import contextlib
+import json
+import os
+import sys
+import time
+import timeit
+
+try:
+	import tracemalloc
+except ImportError:
+	tracemalloc = None
+
+
+if hasattr(time, 'process_time'):
+	_cpu_time = time.process_time
+else:
+	_cpu_time = time.clock
+
+
+class Phase(object):
+	def __init__(self, name):
+		self.name = name
+		self.count = 0
+		self.wallTime = 0.0
+		self.cpuTime = 0.0
+		self.peakMemory = None
+
+	def to_dict(self):
+		return collections.OrderedDict([
+			('name', self.name),
+			('count', self.count),
+			('wall_time', self.wallTime),
+			('cpu_time', self.cpuTime),
+			('peak_memory', self.peakMemory)
+		])
+
+
+class Profiler(object):
+	"""Aggregate the wall time, CPU time and peak of allocated memory of the phases of a generator.
+
+	Phases run several times are summed up. Memory is only measured once start_tracing() has been called, as
+	tracemalloc slows Python down a lot. Its peak is per phase only with Python 3.9 or later, earlier versions
+	report the peak since the start of tracing."""
+
+	def __init__(self):
+		self.phases = collections.OrderedDict()
+		self.tracing = False
+		self._stack = []
+		self._names = []
+		self._boundaryHooks = []
+
+	def start_tracing(self):
+		if tracemalloc is not None:
+			if not tracemalloc.is_tracing():
+				tracemalloc.start()
+			self.tracing = True
+
+	def add_boundary_hook(self, hook):
+		"""Call hook() when a phase starts and when it ends, e.g. to flush buffered messages."""
+		if hook not in self._boundaryHooks:
+			self._boundaryHooks.append(hook)
+
+	def _call_boundary_hooks(self):
+		for hook in self._boundaryHooks:
+			hook()
+
+	def _traced_peak(self):
+		return tracemalloc.get_traced_memory()[1]
+
+	def _reset_peak(self):
+		if hasattr(tracemalloc, 'reset_peak'):
+			tracemalloc.reset_peak()
+
+	@contextlib.contextmanager
+	def phase(self, name):
+		self._call_boundary_hooks()
+		if self.tracing:
+			if len(self._stack) > 0:
+				# Keep the peak of the enclosing phase before measuring this one
+				self._stack[-1] = max(self._stack[-1], self._traced_peak())
+			self._reset_peak()
+		self._stack.append(0)
+		self._names.append(name)
+		startWallTime = timeit.default_timer()
+		startCpuTime = _cpu_time()
+		try:
+			yield
+		finally:
+			phase = self.phases.get(name)
+			if phase is None:
+				phase = Phase(name)
+				self.phases[name] = phase
+			phase.count += 1
+			phase.wallTime += timeit.default_timer() - startWallTime
+			phase.cpuTime += _cpu_time() - startCpuTime
+			peak = self._stack.pop()
+			self._names.pop()
+			if self.tracing:
+				peak = max(peak, self._traced_peak())
+				phase.peakMemory = peak if phase.peakMemory is None else max(phase.peakMemory, peak)
+			self._call_boundary_hooks()
+
+	def current_phase(self):
+		return self._names[-1] if len(self._names) > 0 else None
+
+	def to_dict(self):
+		return collections.OrderedDict([
+			('command', os.path.basename(sys.argv[0])),
+			('tracemalloc', self.tracing),
+			('phases', [phase.to_dict() for phase in self.phases.values()])
+		])
+
+	def dump(self, path, **extra):
+		content = self.to_dict()
+		content.update(extra)
+		with open(path, 'w') as f:
+			json.dump(content, f, indent=2)
+			f.write('\n')
+
+
+profiler = Profiler()
+
+def phase(name):
+	return profiler.phase(name)
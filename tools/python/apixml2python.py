@@ -23,6 +23,9 @@ import sys
 import xml.etree.ElementTree as ET
 
 sys.path.append(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+import diagnostics
+import profiling
 from apixml2python.linphone import LinphoneModule, HandWrittenClassMethod, HandWrittenInstanceMethod, HandWrittenDeallocMethod, HandWrittenProperty
 
 
@@ -105,19 +108,24 @@ hand_written_functions = [
 	HandWrittenInstanceMethod('Factory', 'create_core_with_config', 'linphone_factory_create_core_with_config', "Instantiates a LinphoneCore object with a given LpConfig.\n\n:param cbs: a LinphoneCoreCbs object holding your application callbacks. A reference will be taken on it until the destruciton of the core or the unregistration with linphone_core_remove_cbs().\n:type cbs: linphone.CoreCbs\n:param config: a pointer to an LpConfig object holding the configuration of the LinphoneCore to be instantiated.\n:type config: linphone.Config\n:returns: \n:rtype: linphone.Core"),
 ]
 
-def generate(apixmlfile, outputfile):
-	tree = ET.parse(apixmlfile)
+def generate(apixmlfile, outputfile, trace=True):
+	with profiling.phase('file parse'):
+		tree = ET.parse(apixmlfile)
 	renderer = pystache.Renderer()
-	m = LinphoneModule(tree, blacklisted_classes, blacklisted_events, blacklisted_functions, hand_written_functions)
+	with profiling.phase('abstract parsing'):
+		m = LinphoneModule(tree, blacklisted_classes, blacklisted_events, blacklisted_functions, hand_written_functions, trace=trace)
 	os.chdir('apixml2python')
 	tmpfilename = outputfile.name + '.tmp'
-	with open(tmpfilename, mode='w') as f:
-		f.write(renderer.render(m))
-	with open(tmpfilename, mode='rU') as f:
-		for line in f:
-			if not line.isspace():
-				outputfile.write(line)
-	os.unlink(tmpfilename)
+	with profiling.phase('template rendering'):
+		content = renderer.render(m)
+	with profiling.phase('file writes'):
+		with open(tmpfilename, mode='w') as f:
+			f.write(content)
+		with open(tmpfilename, mode='rU') as f:
+			for line in f:
+				if not line.isspace():
+					outputfile.write(line)
+		os.unlink(tmpfilename)
 
 
 def main(argv = None):
@@ -125,11 +133,20 @@ def main(argv = None):
 		argv = sys.argv
 	argparser = argparse.ArgumentParser(description="Generate a Python wrapper of the Linphone API.")
 	argparser.add_argument('-o', '--outputfile', metavar='outputfile', type=argparse.FileType('w'), help="Output C file containing the code of the Python wrapper.")
+	argparser.add_argument('--no-trace', action='store_true', help="Do not generate the calls tracing the functions of the wrapper, even in builds defining PYLINPHONE_TRACE.")
+	argparser.add_argument('--profile-json', metavar='PATH', help="Write the time and memory used by each phase of the generation to a JSON file.")
 	argparser.add_argument('apixmlfile', help="XML file of the Linphone API generated by genapixml.py.")
 	args = argparser.parse_args()
+	diagnostics.setup()
 	if args.outputfile == None:
 		args.outputfile = open('linphone.c', 'w')
-	generate(args.apixmlfile, args.outputfile)
+	if args.profile_json is not None:
+		# generate() changes the working directory
+		args.profile_json = os.path.abspath(args.profile_json)
+		profiling.profiler.start_tracing()
+	generate(args.apixmlfile, args.outputfile, trace=not args.no_trace)
+	if args.profile_json is not None:
+		profiling.profiler.dump(args.profile_json, diagnostics=diagnostics.summary())
 
 if __name__ == "__main__":
 	sys.exit(main())
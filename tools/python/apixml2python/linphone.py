@@ -15,11 +15,15 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 
+import diagnostics
 import re
 import six
 import sys
 
 
+logger = diagnostics.get_logger('apixml2python')
+
+
 def strip_leading_linphone(s):
 	if s.lower().startswith('linphone'):
 		return s[8:]
@@ -119,6 +123,14 @@ class ArgumentType:
 		self.__compute()
 		if (self.basic_type == 'MSList' or self.basic_type == 'bctbx_list_t') and self.contained_type is not None and self.contained_type != 'const char *':
 			self.linphone_module.bctbxlist_types.add(self.contained_type)
+		self.__dict__['_frozen'] = True
+
+	# The analyzed types are shared by all the arguments of the same type, see
+	# LinphoneModule.argument_type()
+	def __setattr__(self, name, value):
+		if '_frozen' in self.__dict__:
+			raise AttributeError('ArgumentType objects are immutable')
+		self.__dict__[name] = value
 
 	def __compute(self):
 		splitted_type = self.complete_type.split(' ')
@@ -297,17 +309,24 @@ class MethodDefinition:
 		self.xml_method_return = None
 		self.xml_method_args = []
 		self.method_type = 'instancemethod'
+		self.__argument_types = None
+
+	def argument_types(self):
+		# Each argument is analyzed once per method, in the order of xml_method_args
+		if self.__argument_types is None:
+			self.__argument_types = [self.linphone_module.argument_type(arg.get('type'), arg.get('completetype'), arg.get('containedtype')) for arg in self.xml_method_args]
+		return self.__argument_types
+
+	def return_argument_type(self):
+		return self.linphone_module.argument_type(self.return_type, self.return_complete_type, self.return_contained_type)
 
 	def format_local_variables_definition(self):
 		body = self.format_local_return_variables_definition()
 		if self.self_arg is not None:
 			body += "\t" + self.self_arg.get('completetype') + "native_ptr;\n"
-		for xml_method_arg in self.xml_method_args:
+		for xml_method_arg, argument_type in zip(self.xml_method_args, self.argument_types()):
 			arg_name = "_" + xml_method_arg.get('name')
-			arg_type = xml_method_arg.get('type')
 			arg_complete_type = xml_method_arg.get('completetype')
-			arg_contained_type = xml_method_arg.get('containedtype')
-			argument_type = ArgumentType(arg_type, arg_complete_type, arg_contained_type, self.linphone_module)
 			self.parse_tuple_format += argument_type.fmt_str
 			if is_callback(arg_complete_type):
 				body += "\tPyObject * {arg_name};\n".format(arg_name=arg_name)
@@ -326,7 +345,7 @@ class MethodDefinition:
 
 	def format_deprecation_warning(self):
 		if self.method_node is not None and self.method_node.get('deprecated') == 'true':
-			print(self.class_['class_name'] + "." + self.method_name + " is deprecated")
+			logger.warning(self.class_['class_name'] + "." + self.method_name + " is deprecated")
 			return "\tPyErr_WarnEx(PyExc_DeprecationWarning, \"{msg}\", 1);\n".format(msg="{class_name}.{method_name} is deprecated".format(class_name=self.class_['class_name'], method_name=self.method_name))
 		return ""
 
@@ -342,12 +361,8 @@ class MethodDefinition:
 	}}
 """.format(fmt=self.parse_tuple_format, args=', '.join(map(lambda a: '&' + a, self.arg_names)))
 		args_conversion_code = ''
-		for xml_method_arg in self.xml_method_args:
+		for xml_method_arg, argument_type in zip(self.xml_method_args, self.argument_types()):
 			arg_name = "_" + xml_method_arg.get('name')
-			arg_type = xml_method_arg.get('type')
-			arg_complete_type = xml_method_arg.get('completetype')
-			arg_contained_type = xml_method_arg.get('containedtype')
-			argument_type = ArgumentType(arg_type, arg_complete_type, arg_contained_type, self.linphone_module)
 			if argument_type.fmt_str == 'O' and argument_type.convert_code is not None:
 				args_conversion_code += argument_type.convert_code.format(result_name=arg_name, result_suffix='_native_obj', cast='', arg_name=arg_name)
 		return \
@@ -368,14 +383,10 @@ class MethodDefinition:
 		if self.self_arg is not None:
 			fmt += "%p [%p]"
 			args += ["self", "native_ptr"]
-		for xml_method_arg in self.xml_method_args:
+		for xml_method_arg, argument_type in zip(self.xml_method_args, self.argument_types()):
 			arg_name = "_" + xml_method_arg.get('name')
-			arg_type = xml_method_arg.get('type')
-			arg_complete_type = xml_method_arg.get('completetype')
-			arg_contained_type = xml_method_arg.get('containedtype')
 			if fmt != '':
 				fmt += ', '
-			argument_type = ArgumentType(arg_type, arg_complete_type, arg_contained_type, self.linphone_module)
 			fmt += argument_type.cfmt_str
 			args.append(arg_name)
 			if argument_type.fmt_str == 'O' and argument_type.cnativefmt_str is not None:
@@ -394,12 +405,9 @@ class MethodDefinition:
 		c_function_call_code = ''
 		cfree_argument_code = ''
 		python_ref_code = ''
-		for xml_method_arg in self.xml_method_args:
+		for xml_method_arg, argument_type in zip(self.xml_method_args, self.argument_types()):
 			arg_name = "_" + xml_method_arg.get('name')
-			arg_type = xml_method_arg.get('type')
 			arg_complete_type = xml_method_arg.get('completetype')
-			arg_contained_type = xml_method_arg.get('containedtype')
-			argument_type = ArgumentType(arg_type, arg_complete_type, arg_contained_type, self.linphone_module)
 			if argument_type.fmt_str == 'O' and argument_type.use_native_pointer:
 				arg_names.append(arg_name + "_native_ptr")
 			elif argument_type.fmt_str == 'O' and argument_type.convert_code is not None:
@@ -425,6 +433,10 @@ class MethodDefinition:
 			python_ref_code = "Py_INCREF(_cbs);"
 		elif self.method_name == 'remove_callbacks':
 			python_ref_code = "Py_XDECREF(_cbs);"
+		log_drain_code = ''
+		if self.method_node.get('name') == 'linphone_core_iterate':
+			# Give the logs buffered since the previous iteration to the log handler
+			log_drain_code = "pylinphone_drain_logs_to_handler();"
 		from_native_pointer_code = ''
 		convert_from_code = ''
 		build_value_code = ''
@@ -440,7 +452,7 @@ class MethodDefinition:
 						take_native_ref = 'FALSE'
 					from_native_pointer_code = "pyresult = pylinphone_{return_type}_from_native_ptr(&pylinphone_{return_type}Type, cresult, {take_native_ref});\n".format(return_type=stripped_return_type, take_native_ref=take_native_ref)
 				else:
-					return_argument_type = ArgumentType(self.return_type, self.return_complete_type, self.return_contained_type, self.linphone_module)
+					return_argument_type = self.return_argument_type()
 					if return_argument_type.convert_from_func is not None:
 						convert_from_code = \
 """pyresult = {convert_func}(cresult);
@@ -464,6 +476,7 @@ class MethodDefinition:
 	{cfree_argument_code}
 	{python_ref_code}
 	pylinphone_dispatch_messages();
+	{log_drain_code}
 	{from_native_pointer_code}
 	{convert_from_code}
 	{build_value_code}
@@ -471,6 +484,7 @@ class MethodDefinition:
 """.format(c_function_call_code=c_function_call_code,
 		cfree_argument_code=cfree_argument_code,
 		python_ref_code=python_ref_code,
+		log_drain_code=log_drain_code,
 		from_native_pointer_code=from_native_pointer_code,
 		convert_from_code=convert_from_code,
 		build_value_code=build_value_code,
@@ -489,6 +503,8 @@ class MethodDefinition:
 		return "\tPy_RETURN_NONE;"
 
 	def format_return_none_trace(self):
+		if not self.linphone_module.trace:
+			return ''
 		return "\tpylinphone_trace(-1, \"[PYLINPHONE] <<< %s -> None\", __FUNCTION__);\n"
 
 	def format_class_native_pointer_check(self, return_int):
@@ -505,12 +521,9 @@ class MethodDefinition:
 
 	def format_args_type_check(self):
 		body = ''
-		for xml_method_arg in self.xml_method_args:
+		for xml_method_arg, argument_type in zip(self.xml_method_args, self.argument_types()):
 			arg_name = "_" + xml_method_arg.get('name')
 			arg_type = xml_method_arg.get('type')
-			arg_complete_type = xml_method_arg.get('completetype')
-			arg_contained_type = xml_method_arg.get('containedtype')
-			argument_type = ArgumentType(arg_type, arg_complete_type, arg_contained_type, self.linphone_module)
 			if argument_type.fmt_str == 'O':
 				if argument_type.use_native_pointer:
 					body += \
@@ -532,12 +545,9 @@ class MethodDefinition:
 
 	def format_args_native_pointer_check(self):
 		body = ''
-		for xml_method_arg in self.xml_method_args:
+		for xml_method_arg, argument_type in zip(self.xml_method_args, self.argument_types()):
 			arg_name = "_" + xml_method_arg.get('name')
 			arg_type = xml_method_arg.get('type')
-			arg_complete_type = xml_method_arg.get('completetype')
-			arg_contained_type = xml_method_arg.get('containedtype')
-			argument_type = ArgumentType(arg_type, arg_complete_type, arg_contained_type, self.linphone_module)
 			if argument_type.fmt_str == 'O' and argument_type.use_native_pointer:
 				body += \
 """	if (({arg_name} != NULL) && ({arg_name} != Py_None)) {{
@@ -559,11 +569,11 @@ class MethodDefinition:
 		if is_callback(self.return_complete_type):
 			body += "\tPyObject * pyresult;\n"
 			body += "\tPyObject * pyret;\n"
-			argument_type = ArgumentType(self.return_type, self.return_complete_type, self.return_contained_type, self.linphone_module)
+			argument_type = self.return_argument_type()
 			self.build_value_format = argument_type.fmt_str
 		elif self.return_complete_type != 'void':
 			body += "\t" + self.return_complete_type + " cresult;\n"
-			argument_type = ArgumentType(self.return_type, self.return_complete_type, self.return_contained_type, self.linphone_module)
+			argument_type = self.return_argument_type()
 			self.build_value_format = argument_type.fmt_str
 			if self.build_value_format == 'O':
 				body += "\tPyObject * pyresult;\n"
@@ -578,6 +588,7 @@ class MethodDefinition:
 		if self.method_type != 'classmethod' and len(self.xml_method_args) > 0:
 			self.self_arg = self.xml_method_args[0]
 			self.xml_method_args = self.xml_method_args[1:]
+		self.__argument_types = None
 
 	def find_class_definition(self, basic_type):
 		basic_type = strip_leading_linphone(basic_type)
@@ -600,9 +611,11 @@ class MethodDefinition:
 		body = self.format_local_variables_definition()
 		body += self.format_deprecation_warning()
 		body += self.format_arguments_parsing()
-		body += self.format_enter_trace()
+		if self.linphone_module.trace:
+			body += self.format_enter_trace()
 		body += self.format_c_function_call()
-		body += self.format_return_trace()
+		if self.linphone_module.trace:
+			body += self.format_return_trace()
 		body += self.format_return_result()
 		return body
 
@@ -878,7 +891,7 @@ class SetterMethodDefinition(MethodDefinition):
 		self.first_arg_complete_type = self.xml_method_args[0].get('completetype')
 		self.first_arg_contained_type = self.xml_method_args[0].get('containedtype')
 		self.first_arg_name = self.xml_method_args[0].get('name')
-		self.first_argument_type = ArgumentType(self.first_arg_type, self.first_arg_complete_type, self.first_arg_contained_type, self.linphone_module)
+		self.first_argument_type = self.argument_types()[0]
 		self.first_arg_class = strip_leading_linphone(self.first_arg_type)
 
 class EventCallbackMethodDefinition(MethodDefinition):
@@ -906,12 +919,8 @@ class EventCallbackMethodDefinition(MethodDefinition):
 	pylinphone_{class_name}Object *pycbs = (pylinphone_{class_name}Object *){cbs_function_prefix}get_user_data({function_prefix}{get_callbacks_funcname}(self));
 """.format(class_name=class_name, cbs_function_prefix=self.find_class_definition(class_name)['class_c_function_prefix'], function_prefix=self.find_class_definition(nocallbacks_class_name)['class_c_function_prefix'], get_callbacks_funcname=get_callbacks_funcname)
 		specific = ''
-		for xml_method_arg in self.xml_method_args:
+		for xml_method_arg, argument_type in zip(self.xml_method_args, self.argument_types()):
 			arg_name = xml_method_arg.get('name')
-			arg_type = xml_method_arg.get('type')
-			arg_complete_type = xml_method_arg.get('completetype')
-			arg_contained_type = xml_method_arg.get('containedtype')
-			argument_type = ArgumentType(arg_type, arg_complete_type, arg_contained_type, self.linphone_module)
 			if argument_type.fmt_str == 'O':
 				specific += "\tPyObject * py" + arg_name + " = NULL;\n"
 		return "{returnvars}\n{common}\n{specific}".format(returnvars=returnvars, common=common, specific=specific)
@@ -923,7 +932,7 @@ class EventCallbackMethodDefinition(MethodDefinition):
 		elif self.return_complete_type == 'bool_t':
 			return_str = 'FALSE'
 		elif self.return_complete_type != 'void':
-			argument_type = ArgumentType(self.return_type, self.return_complete_type, self.return_contained_type, self.linphone_module)
+			argument_type = self.return_argument_type()
 			if argument_type.fmt_str == 'O':
 				return_str = 'NULL'
 		return \
@@ -935,14 +944,10 @@ class EventCallbackMethodDefinition(MethodDefinition):
 	def format_enter_trace(self):
 		fmt = '%p'
 		args = ['self']
-		for xml_method_arg in self.xml_method_args:
+		for xml_method_arg, argument_type in zip(self.xml_method_args, self.argument_types()):
 			arg_name = xml_method_arg.get('name')
-			arg_type = xml_method_arg.get('type')
-			arg_complete_type = xml_method_arg.get('completetype')
-			arg_contained_type = xml_method_arg.get('containedtype')
 			if fmt != '':
 				fmt += ', '
-			argument_type = ArgumentType(arg_type, arg_complete_type, arg_contained_type, self.linphone_module)
 			fmt += argument_type.cfmt_str
 			args.append(arg_name)
 		args=', '.join(args)
@@ -955,12 +960,9 @@ class EventCallbackMethodDefinition(MethodDefinition):
 		convert_python_result_code = ''
 		fmt = 'O'
 		args = ['pyself']
-		for xml_method_arg in self.xml_method_args:
+		for xml_method_arg, argument_type in zip(self.xml_method_args, self.argument_types()):
 			arg_name = xml_method_arg.get('name')
 			arg_type = xml_method_arg.get('type')
-			arg_complete_type = xml_method_arg.get('completetype')
-			arg_contained_type = xml_method_arg.get('containedtype')
-			argument_type = ArgumentType(arg_type, arg_complete_type, arg_contained_type, self.linphone_module)
 			fmt += argument_type.fmt_str
 			if argument_type.fmt_str == 'O':
 				args.append('py' + arg_name)
@@ -974,7 +976,7 @@ class EventCallbackMethodDefinition(MethodDefinition):
 					create_python_objects_code += "\t\tpy{name} = pylinphone_{arg_type}_from_native_ptr(&pylinphone_{arg_type}Type, {name}, TRUE);\n".format(name=arg_name, arg_type=strip_leading_linphone(arg_type))
 		args=', '.join(args)
 		if self.return_complete_type != 'void':
-			argument_type = ArgumentType(self.return_type, self.return_complete_type, self.return_contained_type, self.linphone_module)
+			argument_type = self.return_argument_type()
 			if argument_type.is_linphone_object:
 				convert_python_result_code = \
 """		if ((pyresult != Py_None) && !PyObject_IsInstance(pyresult, (PyObject *)&pylinphone_{class_name}Type)) {{
@@ -1041,11 +1043,14 @@ class EventCallbackMethodDefinition(MethodDefinition):
 
 
 class LinphoneModule(object):
-	def __init__(self, tree, blacklisted_classes, blacklisted_events, blacklisted_functions, hand_written_codes):
+	def __init__(self, tree, blacklisted_classes, blacklisted_events, blacklisted_functions, hand_written_codes, trace=True):
+		# Whether the generated functions call pylinphone_trace()
+		self.trace = trace
 		self.known_types = ['char', 'int', 'int8_t', 'int16_t', 'int32_t', 'int64_t', 'uint8_t', 'uint16_t', 'uint32_t', 'uint64_t', 'bool_t', 'float', 'double', 'size_t', 'time_t', 'MSList', 'bctbx_list_t', 'MSVideoSize', 'LCSipTransports', 'LinphoneStatus']
 		self.internal_instance_method_names = ['destroy', 'ref', 'unref']
 		self.internal_property_names = ['user_data']
 		self.bctbxlist_types = set([])
+		self.argument_types = {}
 		self.enums = []
 		self.enum_names = []
 		self.cfunction2methodmap = {}
@@ -1234,7 +1239,7 @@ class LinphoneModule(object):
 			try:
 				c['new_body'] = NewMethodDefinition(self, c, xml_new_method).format()
 			except (UnknownTypeException) as e:
-				print(e)
+				logger.warning(str(e))
 				c['blacklisted'] = True
 			except (Exception) as e:
 				e.args += (c['class_name'], 'new_body')
@@ -1242,7 +1247,7 @@ class LinphoneModule(object):
 			try:
 				c['init_body'] = InitMethodDefinition(self, c, xml_new_method).format()
 			except (UnknownTypeException) as e:
-				print(e)
+				logger.warning(str(e))
 				c['blacklisted'] = True
 			except (Exception) as e:
 				e.args += (c['class_name'], 'init_body')
@@ -1250,7 +1255,7 @@ class LinphoneModule(object):
 			try:
 				c['from_native_pointer_body'] = FromNativePointerMethodDefinition(self, c).format()
 			except (UnknownTypeException) as e:
-				print(e)
+				logger.warning(str(e))
 				c['blacklisted'] = True
 			except (Exception) as e:
 				e.args += (c['class_name'], 'from_native_pointer_body')
@@ -1261,7 +1266,7 @@ class LinphoneModule(object):
 					m['method_doc'] = self.__format_method_doc(m['method_xml_node'])
 					m['method_doc'] = m['method_doc'].encode('unicode_escape')
 				except (UnknownTypeException) as e:
-					print(e)
+					logger.warning(str(e))
 					m['blacklisted'] = True
 				except (Exception) as e:
 					e.args += (c['class_name'], m['method_name'])
@@ -1272,7 +1277,7 @@ class LinphoneModule(object):
 					m['method_doc'] = self.__format_method_doc(m['method_xml_node'])
 					m['method_doc'] = m['method_doc'].encode('unicode_escape')
 				except (UnknownTypeException) as e:
-					print(e)
+					logger.warning(str(e))
 					m['blacklisted'] = True
 				except (Exception) as e:
 					e.args += (c['class_name'], m['method_name'])
@@ -1284,7 +1289,7 @@ class LinphoneModule(object):
 						p['setter_body'] = SetterMethodDefinition(self, c, p['property_name'], p['setter_xml_node']).format()
 						p['property_doc'] = self.__format_setter_doc(p['setter_xml_node'])
 					except (UnknownTypeException) as e:
-						print(e)
+						logger.warning(str(e))
 						p['blacklisted'] = True
 					except (Exception) as e:
 						e.args += (c['class_name'], p['property_name'])
@@ -1295,7 +1300,7 @@ class LinphoneModule(object):
 						if p['property_doc'] == '':
 							p['property_doc'] = self.__format_getter_doc(p['getter_xml_node'])
 					except (UnknownTypeException) as e:
-						print(e)
+						logger.warning(str(e))
 						p['blacklisted'] = True
 					except (Exception) as e:
 						e.args += (c['class_name'], p['property_name'])
@@ -1312,7 +1317,7 @@ class LinphoneModule(object):
 					else:
 						c['dealloc_definition'] = DeallocMethodDefinition(self, c).format()
 				except (UnknownTypeException) as e:
-					print(e)
+					logger.warning(str(e))
 					c['blacklisted'] = True
 				except (Exception) as e:
 					e.args += (c['class_name'], 'dealloc_body')
@@ -1332,6 +1337,16 @@ class LinphoneModule(object):
 			d.append(t)
 		self.bctbxlist_types = d
 
+	def argument_type(self, basic_type, complete_type, contained_type):
+		# The analysis of a type only depends on the module, it is shared by
+		# all the arguments and return values of that type
+		key = (basic_type, complete_type, contained_type)
+		argument_type = self.argument_types.get(key)
+		if argument_type is None:
+			argument_type = ArgumentType(basic_type, complete_type, contained_type, self)
+			self.argument_types[key] = argument_type
+		return argument_type
+
 	def __format_doc_node(self, node):
 		desc = ''
 		if node.tag == 'para':
@@ -1412,7 +1427,7 @@ class LinphoneModule(object):
 				arg_type = xml_method_arg.get('type')
 				arg_complete_type = xml_method_arg.get('completetype')
 				arg_contained_type = xml_method_arg.get('containedtype')
-				argument_type = ArgumentType(arg_type, arg_complete_type, arg_contained_type, self)
+				argument_type = self.argument_type(arg_type, arg_complete_type, arg_contained_type)
 				arg_doc = self.__format_doc_content(None, xml_method_arg.find('description'))
 				doc += '\n:param ' + arg_name + ':'
 				if arg_doc != '':
@@ -1424,7 +1439,7 @@ class LinphoneModule(object):
 			return_contained_type = xml_method_return.get('containedtype')
 			if return_complete_type != 'void':
 				return_doc = self.__format_doc_content(None, xml_method_return.find('description'))
-				return_argument_type = ArgumentType(return_type, return_complete_type, return_contained_type, self)
+				return_argument_type = self.argument_type(return_type, return_complete_type, return_contained_type)
 				doc += '\n:returns: ' + return_doc
 				doc += '\n:rtype: ' + return_argument_type.type_str
 		doc = self.__replace_doc_cfunction_by_method(doc)
@@ -1437,7 +1452,7 @@ class LinphoneModule(object):
 		arg_type = xml_method_arg.get('type')
 		arg_complete_type = xml_method_arg.get('completetype')
 		arg_contained_type = xml_method_arg.get('containedtype')
-		argument_type = ArgumentType(arg_type, arg_complete_type, arg_contained_type, self)
+		argument_type = self.argument_type(arg_type, arg_complete_type, arg_contained_type)
 		doc = self.__format_doc_content(xml_node.find('briefdescription'), xml_node.find('detaileddescription'))
 		doc = '[' + argument_type.type_str + '] ' + doc
 		doc = self.__replace_doc_cfunction_by_method(doc)
@@ -1450,7 +1465,7 @@ class LinphoneModule(object):
 		return_type = xml_method_return.get('type')
 		return_complete_type = xml_method_return.get('completetype')
 		return_contained_type = xml_method_return.get('containedtype')
-		return_argument_type = ArgumentType(return_type, return_complete_type, return_contained_type, self)
+		return_argument_type = self.argument_type(return_type, return_complete_type, return_contained_type)
 		doc = self.__format_doc_content(xml_node.find('briefdescription'), xml_node.find('detaileddescription'))
 		doc = '[' + return_argument_type.type_str + '] ' + doc
 		doc = self.__replace_doc_cfunction_by_method(doc)
@@ -0,0 +1,134 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+# Check that genapixml.py writes the same api.xml whether the XML files are
+# parsed, taken from the parse cache or from a snapshot, including after one
+# of them changed. Run with python -m unittest from this directory.
+
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import diagnostics
+import genapixml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+import doxygen_synth
+
+
+class MessageCollector(logging.Handler):
+	def __init__(self):
+		logging.Handler.__init__(self)
+		self.messages = []
+
+	def emit(self, record):
+		self.messages.append(record.getMessage())
+
+
+class ApiXmlTestCase(unittest.TestCase):
+	def setUp(self):
+		self.workdir = tempfile.mkdtemp()
+		self.xmldir = os.path.join(self.workdir, 'xml')
+		self.cacheDir = os.path.join(self.workdir, 'cache')
+		self.snapshot = os.path.join(self.workdir, 'api.snapshot')
+		size = doxygen_synth.ApiSize(classes=3, methods=3, properties=2, callbacks=1, enums=1, paragraphs=1)
+		doxygen_synth.generate(self.xmldir, size)
+		self.logger = logging.getLogger(diagnostics.ROOT_LOGGER_NAME)
+		self.level = self.logger.level
+		self.logger.setLevel(logging.DEBUG)
+		self.collector = MessageCollector()
+		self.logger.addHandler(self.collector)
+
+	def tearDown(self):
+		self.logger.removeHandler(self.collector)
+		self.logger.setLevel(self.level)
+		shutil.rmtree(self.workdir)
+
+	def new_project(self, cacheDir=None):
+		project = genapixml.Project()
+		project.verbose = True
+		project.cacheDir = cacheDir
+		return project
+
+	def api_xml(self, project):
+		path = os.path.join(self.workdir, 'api.xml')
+		with open(path, 'w') as f:
+			genapixml.Generator(f).generate(project)
+		with open(path, 'r') as f:
+			return f.read()
+
+	def take_messages(self, word):
+		messages = [message for message in self.collector.messages if word in message]
+		self.collector.messages = []
+		return messages
+
+	def parse(self, cacheDir=None):
+		project = self.new_project(cacheDir)
+		project.initFromDir(self.xmldir)
+		return self.api_xml(project)
+
+	def parse_snapshot(self):
+		project = self.new_project()
+		project.initFromSnapshot(self.snapshot, self.xmldir)
+		return self.api_xml(project)
+
+	def change_brief(self):
+		path = os.path.join(self.xmldir, 'group__synth1.xml')
+		with open(path, 'r') as f:
+			content = f.read()
+		with open(path, 'w') as f:
+			f.write(content.replace('Perform action 0 on the LinphoneSynth1.', 'Perform the first action on the LinphoneSynth1.'))
+
+	def test_parse_cache(self):
+		fileCount = len(os.listdir(self.xmldir))
+		cold = self.parse(self.cacheDir)
+		self.assertEqual(self.take_messages('Parse cache'), ['Parse cache: 0 files reused, {0} files parsed'.format(fileCount)])
+		self.assertEqual(self.parse(), cold)
+		self.assertEqual(self.parse(self.cacheDir), cold)
+		self.assertEqual(self.take_messages('Parse cache'), ['Parse cache: {0} files reused, 0 files parsed'.format(fileCount)])
+
+		self.change_brief()
+		changed = self.parse()
+		self.assertNotEqual(changed, cold)
+		self.assertEqual(self.parse(self.cacheDir), changed)
+		self.assertEqual(self.take_messages('Parse cache'), ['Parse cache: {0} files reused, 1 files parsed'.format(fileCount - 1)])
+
+	def test_snapshot(self):
+		project = self.new_project(self.cacheDir)
+		project.initFromDir(self.xmldir)
+		cold = self.api_xml(project)
+		project.saveSnapshot(self.snapshot, self.xmldir)
+		self.take_messages('napshot')
+		self.assertEqual(self.parse_snapshot(), cold)
+		self.assertEqual(self.take_messages('outdated'), [])
+
+		self.change_brief()
+		changed = self.parse()
+		self.assertNotEqual(changed, cold)
+		# The outdated snapshot is replaced by the parsing of the XML directory
+		self.assertEqual(self.parse_snapshot(), changed)
+		self.assertEqual(len(self.take_messages('outdated')), 1)
+		self.assertEqual(self.parse_snapshot(), changed)
+		self.assertEqual(self.take_messages('outdated'), [])
+
+
+if __name__ == '__main__':
+	unittest.main()
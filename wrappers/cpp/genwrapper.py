@@ -20,22 +20,31 @@
 import pystache
 import re
 import argparse
+import glob
 import os
 import sys
 import errno
+import logging
+import multiprocessing
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'tools'))
 import genapixml as CApi
 import abstractapi as AbsApi
+import diagnostics
+import manifest
 import metadoc
+import profiling
+
+
+logger = diagnostics.get_logger('cpp')
 
 
 class CppTranslator(object):
 	sharedPtrTypeExtractor = re.compile('^(const )?std::shared_ptr<(.+)>( &)?$')
 	
-	def __init__(self):
+	def __init__(self, api=None):
 		self.ignore = []
 		self.ambigousTypes = ['LinphonePayloadType']
-		self.docTranslator = metadoc.DoxygenCppTranslator()
+		self.docTranslator = metadoc.DoxygenCppTranslator(api)
 	
 	def is_ambigous_type(self, _type):
 		return _type.name in self.ambigousTypes or (_type.name == 'list' and self.is_ambigous_type(_type.containedTypeDesc))
@@ -121,21 +130,21 @@ class CppTranslator(object):
 			try:
 				classDict['methods'] += self.translate_property(_property)
 			except AbsApi.Error as e:
-				print('error while translating {0} property: {1}'.format(_property.name.to_snake_case(), e.args[0]))
+				logger.error('error while translating {0} property: {1}'.format(_property.name.to_snake_case(), e.args[0]))
 		
 		for method in _class.instanceMethods:
 			try:
 				methodDict = self.translate_method(method)
 				classDict['methods'].append(methodDict)
 			except AbsApi.Error as e:
-				print('Could not translate {0}: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
+				logger.error('Could not translate {0}: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
 				
 		for method in _class.classMethods:
 			try:
 				methodDict = self.translate_method(method)
 				classDict['staticMethods'].append(methodDict)
 			except AbsApi.Error as e:
-				print('Could not translate {0}: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
+				logger.error('Could not translate {0}: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
 		
 		return classDict
 	
@@ -183,7 +192,7 @@ class CppTranslator(object):
 				methodDict = self.translate_method(method, genImpl=False)
 				intDict['methods'].append(methodDict)
 			except AbsApi.Error as e:
-				print('Could not translate {0}: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
+				logger.error('Could not translate {0}: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
 		
 		return intDict
 	
@@ -577,7 +586,7 @@ class EnumsHeader(object):
 
 
 class ClassHeader(object):
-	def __init__(self, _class, translator):
+	def __init__(self, _class, translator, parser):
 		if type(_class) is AbsApi.Class:
 			self._class = translator.translate_class(_class)
 		else:
@@ -589,7 +598,7 @@ class ClassHeader(object):
 		self.private_type = _class.name.to_camel_case(fullName=True)
 		
 		self.includes = {'internal': [], 'external': []}
-		includes = self.needed_includes(_class)
+		includes = self.needed_includes(_class, parser)
 		for include in includes['internal']:
 			if _class.name.to_camel_case(fullName=True) == 'LinphoneCore' or (isinstance(_class, AbsApi.Interface) and _class.listenedClass is not None and include == _class.listenedClass.name.to_snake_case()):
 				if include == 'enums':
@@ -604,9 +613,15 @@ class ClassHeader(object):
 		for include in includes['external']:
 			self.includes['external'].append({'name': include})
 	
-	def needed_includes(self, _class):
+	def needed_includes(self, _class, parser):
 		includes = {'internal': [], 'external': []}
 		
+		for dependency in parser.dependencies_of(_class):
+			if isinstance(dependency, AbsApi.Enum):
+				self._add_include(includes, 'internal', 'enums')
+			else:
+				self._add_include(includes, 'internal', dependency.name.to_snake_case())
+		
 		if type(_class) is AbsApi.Class:
 			for _property in _class.properties:
 				if _property.setter is not None:
@@ -624,9 +639,6 @@ class ClassHeader(object):
 			for arg in method.args:
 				self._needed_includes_from_type(arg.type, includes)
 		
-		if isinstance(_class, AbsApi.Class) and _class.listenerInterface is not None:
-			self._add_include(includes, 'internal', _class.listenerInterface.name.to_snake_case())
-		
 		currentClassInclude = _class.name.to_snake_case()
 		if currentClassInclude in includes['internal']:
 			includes['internal'].remove(currentClassInclude)
@@ -638,13 +650,11 @@ class ClassHeader(object):
 		for arg in method.args:
 			self._needed_includes_from_type(arg.type, includes)
 	
+	# The internal includes are given by the dependencies of the class, only the
+	# standard headers needed by the types are looked for here
 	def _needed_includes_from_type(self, _type, includes):
 		if isinstance(_type, AbsApi.ClassType):
 			self._add_include(includes, 'external', 'memory')
-			if _type.desc is not None:
-				self._add_include(includes, 'internal', _type.desc.name.to_snake_case())
-		elif isinstance(_type, AbsApi.EnumType):
-			self._add_include(includes, 'internal', 'enums')
 		elif isinstance(_type, AbsApi.BaseType):
 			if _type.name == 'integer' and isinstance(_type.size, int):
 				self._add_include(includes, 'external', 'cstdint')
@@ -674,90 +684,204 @@ class ClassImpl(object):
 		self.namespace = 'linphone'
 
 class GenWrapper(object):
-	def __init__(self, includedir, srcdir, xmldir):
+	def __init__(self, includedir, srcdir, parser, manifest=None, jobs=1):
 		self.includedir = includedir
 		self.srcdir = srcdir
-
-		project = CApi.Project()
-		project.initFromDir(xmldir)
-		project.check()
-		
-		self.parser = AbsApi.CParser(project)
-		self.parser.parse_all()
-		self.translator = CppTranslator()
+		self.parser = parser
+		# Files whose content did not change are not written again
+		self.manifest = manifest
+		# Number of processes rendering the class headers
+		self.jobs = jobs
+		self.translator = CppTranslator(parser)
 		self.renderer = pystache.Renderer()	
 		self.mainHeader = MainHeader()
 		self.impl = ClassImpl()
 
 	def render_all(self):
 		header = EnumsHeader(self.translator)
-		for item in self.parser.enumsIndex.items():
-			if item[1] is not None:
-				header.add_enum(item[1])
-			else:
-				print('warning: {0} enum won\'t be translated because of parsing errors'.format(item[0]))
+		with profiling.phase('translation'):
+			for item in self.parser.enumsIndex.items():
+				if item[1] is not None:
+					header.add_enum(item[1])
+				else:
+					logger.warning('warning: {0} enum won\'t be translated because of parsing errors'.format(item[0]))
 		
 		self.render(header, self.includedir + '/enums.hh')
 		self.mainHeader.add_include('enums.hh')
 		
-		for _class in self.parser.interfacesIndex.values():
-			self.render_header(_class)
-		for _class in self.parser.classesIndex.values():
-			self.render_header(_class)
+		classes = [(cname, _class) for cname, _class in self.parser.interfacesIndex.items() if _class is not None]
+		classes += [(cname, _class) for cname, _class in self.parser.classesIndex.items() if _class is not None]
+		if self.jobs > 1 and len(classes) > 1:
+			with profiling.phase('parallel rendering'):
+				headers = self._render_headers_in_parallel(classes)
+		else:
+			headers = [self.render_header(_class, self.parser.is_affected(cname)) for cname, _class in classes]
+		
+		# Merged in the order of the indexes, whatever the way they were rendered
+		for header in headers:
+			if header is not None:
+				self._add_header(*header)
 		
 		self.render(self.mainHeader, self.includedir + '/linphone.hh')
 		self.render(self.impl, self.srcdir + '/linphone++.cc')
+		self.parser.report_unresolved_references()
+
+	def _render_headers_in_parallel(self, classes):
+		# Do not let the workers inherit pending messages
+		diagnostics.flush()
+		verbose = logger.isEnabledFor(logging.DEBUG)
+		pool = multiprocessing.Pool(min(self.jobs, len(classes)), _init_rendering_worker, (self, classes, verbose))
+		try:
+			results = pool.map(_render_header_in_worker, list(range(len(classes))), max(1, len(classes) // (self.jobs * 4)))
+		finally:
+			pool.close()
+			pool.join()
+		
+		headers = []
+		for header, records, unresolvedReferences in results:
+			diagnostics.replay(records)
+			for cname in unresolvedReferences:
+				self.parser.unresolvedReferences[cname] = None
+			headers.append(header)
+		return headers
 
 	def render(self, item, path):
-		tmppath = path + '.tmp'
-		content = ''
-		with open(tmppath, mode='w') as f:
-			f.write(self.renderer.render(item))
-		with open(tmppath, mode='rU') as f:
-			content = f.read()
-		with open(path, mode='w') as f:
-			f.write(content)
-		os.unlink(tmppath)
-
-	def render_header(self, _class):
-		if _class is not None:
-			try:
-				header = ClassHeader(_class, self.translator)
-				headerName = _class.name.to_snake_case() + '.hh'
-				self.mainHeader.add_include(headerName)
-				self.render(header, self.includedir + '/' + header.filename)
-				
-				if type(_class) is not AbsApi.Interface:
-					self.impl.classes.append(header._class)
-				
-			except AbsApi.Error as e:
-				print('Could not translate {0}: {1}'.format(_class.name.to_camel_case(fullName=True), e.args[0]))
+		self._write(path, self._render_content(item))
 
-def main():
-	argparser = argparse.ArgumentParser(description='Generate source files for the C++ wrapper')
-	argparser.add_argument('xmldir', type=str, help='Directory where the XML documentation of the Linphone\'s API generated by Doxygen is placed')
-	argparser.add_argument('-o --output', type=str, help='the directory where to generate the source files', dest='outputdir', default='.')
-	args = argparser.parse_args()
-	
-	includedir = args.outputdir + '/include/linphone++'
-	srcdir = args.outputdir + '/src'
+	def _render_content(self, item):
+		with profiling.phase('template rendering'):
+			return manifest.normalize_newlines(self.renderer.render(item))
+
+	def _write(self, path, content):
+		with profiling.phase('file writes'):
+			if self.manifest is not None:
+				self.manifest.write(path, content)
+			else:
+				with open(path, mode='w') as f:
+					f.write(content)
+
+	# The class is translated anyway, as linphone++.cc implements all of them.
+	# Returns the name of the header, where to write it, its content if it has
+	# to be written and the translated class to implement, or None if the class
+	# cannot be translated.
+	def render_header(self, _class, affected=True):
+		try:
+			with profiling.phase('translation'):
+				header = ClassHeader(_class, self.translator, self.parser)
+		except AbsApi.Error as e:
+			logger.error('Could not translate {0}: {1}'.format(_class.name.to_camel_case(fullName=True), e.args[0]))
+			return None
+		
+		headerName = _class.name.to_snake_case() + '.hh'
+		path = self.includedir + '/' + header.filename
+		content = None
+		if affected or self.manifest is None or not self.manifest.recorded(path):
+			content = self._render_content(header)
+		implClass = header._class if type(_class) is not AbsApi.Interface else None
+		return (headerName, path, content, implClass)
+
+	def _add_header(self, headerName, path, content, implClass):
+		self.mainHeader.add_include(headerName)
+		if content is not None:
+			self._write(path, content)
+		if implClass is not None:
+			self.impl.classes.append(implClass)
+
+
+_workerGenWrapper = None
+_workerClasses = None
+
+def _init_rendering_worker(genwrapper, classes, verbose):
+	global _workerGenWrapper, _workerClasses
+	diagnostics.setup_worker(verbose)
+	_workerGenWrapper = genwrapper
+	_workerClasses = classes
+
+# The translated view of the class is sent back to the main process, which
+# writes the files and builds linphone.hh and linphone++.cc
+def _render_header_in_worker(index):
+	cname, _class = _workerClasses[index]
+	parser = _workerGenWrapper.parser
+	header = _workerGenWrapper.render_header(_class, parser.is_affected(cname))
+	unresolvedReferences = list(parser.unresolvedReferences.keys())
+	parser.unresolvedReferences.clear()
+	return (header, diagnostics.take_records(), unresolvedReferences)
+
+
+def blacklists(parser):
+	return (list(parser.methodBl), list(parser.functionBl), list(parser.classBl))
+
+
+def generator_files():
+	directory = os.path.dirname(os.path.abspath(__file__))
+	return [os.path.join(directory, 'genwrapper.py')] + sorted(glob.glob(os.path.join(directory, '*.mustache')))
+
+
+def parse_api(xmldir, jobs=1, docs=True, cacheDir=None):
+	project = CApi.Project()
+	project.jobs = jobs
+	project.cacheDir = cacheDir
+	project.initFromDirOrSnapshot(xmldir)
+	project.check()
+	
+	parser = AbsApi.CParser(project)
+	parser.methodBl, parser.functionBl, parser.classBl = blacklists(parser)
+	parser.jobs = jobs
+	parser.docs = docs
+	if cacheDir is not None:
+		parser.cacheFile = os.path.join(cacheDir, 'cpp-classes.pickle')
+		parser.cacheDependencies = generator_files()
+	parser.parse_all()
+	return parser
+
+
+def generate(parser, outputdir, jobs=1):
+	includedir = outputdir + '/include/linphone++'
+	srcdir = outputdir + '/src'
 	
 	try:
 		os.makedirs(includedir)
 	except OSError as e:
 		if e.errno != errno.EEXIST:
-			print("Cannot create '{0}' dircetory: {1}".format(includedir, e.strerror))
+			logger.error("Cannot create '{0}' dircetory: {1}".format(includedir, e.strerror))
 			sys.exit(1)
 	
 	try:
 		os.makedirs(srcdir)
 	except OSError as e:
 		if e.errno != errno.EEXIST:
-			print("Cannot create '{0}' dircetory: {1}".format(srcdir, e.strerror))
+			logger.error("Cannot create '{0}' dircetory: {1}".format(srcdir, e.strerror))
 			sys.exit(1)
 	
-	genwrapper = GenWrapper(includedir, srcdir, args.xmldir)
+	outputs = manifest.Manifest(outputdir)
+	# Only the headers of the classes which changed since the generation of
+	# the files of the output directory are rendered again
+	parser.compare_with_fingerprints(outputs.fingerprints)
+	genwrapper = GenWrapper(includedir, srcdir, parser, manifest=outputs, jobs=jobs)
 	genwrapper.render_all()
+	outputs.set_fingerprints(parser.fingerprints())
+	outputs.save()
+	parser.save_cache()
+	logger.debug('{0} file(s) written, {1} unchanged'.format(outputs.written, outputs.skipped))
+
+
+def main():
+	argparser = argparse.ArgumentParser(description='Generate source files for the C++ wrapper')
+	argparser.add_argument('xmldir', type=str, help='Directory where the XML documentation of the Linphone\'s API generated by Doxygen is placed, or snapshot of the API saved by genapixml.py --snapshot')
+	argparser.add_argument('-o --output', type=str, help='the directory where to generate the source files', dest='outputdir', default='.')
+	argparser.add_argument('--profile-json', type=str, help='write the time and memory used by each phase of the generation to a JSON file', dest='profileJson')
+	argparser.add_argument('-j', '--jobs', type=int, help='number of processes used to parse the API and to render the class headers', dest='jobs', default=1)
+	argparser.add_argument('--no-docs', action='store_true', help='do not generate the documentation of the API, which is faster', dest='noDocs')
+	argparser.add_argument('--cache-dir', type=str, help='directory where the parsing of the API is cached, so that only the modified parts are parsed and generated again', dest='cacheDir')
+	args = argparser.parse_args()
+	diagnostics.setup()
+	if args.profileJson is not None:
+		profiling.profiler.start_tracing()
+	
+	parser = parse_api(args.xmldir, jobs=args.jobs, docs=not args.noDocs, cacheDir=args.cacheDir)
+	generate(parser, args.outputdir, jobs=args.jobs)
+	if args.profileJson is not None:
+		profiling.profiler.dump(args.profileJson, diagnostics=diagnostics.summary())
 
 
 if __name__ == '__main__':
@@ -17,6 +17,9 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import argparse
+import glob
+import logging
+import multiprocessing
 import os
 import sys
 import pystache
@@ -25,12 +28,18 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'tools'))
 print sys.path
 import genapixml as CApi
 import abstractapi as AbsApi
+import diagnostics
+import manifest
 import metadoc
+import profiling
+
+logger = diagnostics.get_logger('csharp')
+
 
 class CsharpTranslator(object):
-	def __init__(self):
+	def __init__(self, api=None):
 		self.ignore = []
-		self.docTranslator = metadoc.SandcastleCSharpTranslator()
+		self.docTranslator = metadoc.SandcastleCSharpTranslator(api)
 
 	def init_method_dict(self):
 		methodDict = {}
@@ -495,20 +504,20 @@ class CsharpTranslator(object):
 					methodDict = self.translate_method(method, static=True, genImpl=True)
 				classDict['dllImports'].append(methodDict)
 			except AbsApi.Error as e:
-				print('Could not translate {0}: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
+				logger.error('Could not translate {0}: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
 
 		for prop in _class.properties:
 			try:
 				classDict['dllImports'] += self.translate_property(prop)
 			except AbsApi.Error as e:
-				print('error while translating {0} property: {1}'.format(prop.name.to_snake_case(), e.args[0]))
+				logger.error('error while translating {0} property: {1}'.format(prop.name.to_snake_case(), e.args[0]))
 
 		for method in _class.instanceMethods:
 			try:
 				methodDict = self.translate_method(method, static=False, genImpl=True)
 				classDict['dllImports'].append(methodDict)
 			except AbsApi.Error as e:
-				print('Could not translate {0}: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
+				logger.error('Could not translate {0}: {1}'.format(method.name.to_snake_case(fullName=True), e.args[0]))
 
 		return classDict
 
@@ -552,62 +561,141 @@ class WrapperImpl(object):
 	
 ###########################################################################################################################################
 
-def render(renderer, item, path):
-	tmppath = path + '.tmp'
+def render(renderer, item, path, outputs=None):
 	content = ''
-	with open(tmppath, mode='w') as f:
-		f.write(renderer.render(item))
-	with open(tmppath, mode='rU') as f:
-		content = f.read()
-	with open(path, mode='w') as f:
-		f.write(content)
-	os.unlink(tmppath)
+	with profiling.phase('template rendering'):
+		content = manifest.normalize_newlines(renderer.render(item))
+	with profiling.phase('file writes'):
+		if outputs is not None:
+			outputs.write(path, content)
+		else:
+			with open(path, mode='w') as f:
+				f.write(content)
 
-def main():
-	argparser = argparse.ArgumentParser(description='Generate source files for the C++ wrapper')
-	argparser.add_argument('xmldir', type=str, help='Directory where the XML documentation of the Linphone\'s API generated by Doxygen is placed')
-	argparser.add_argument('-o --output', type=str, help='the directory where to generate the source files', dest='outputdir', default='.')
-	argparser.add_argument('-n --name', type=str, help='the name of the genarated source file', dest='outputfile', default='LinphoneWrapper.cs')
-	args = argparser.parse_args()
-	
-	entries = os.listdir(args.outputdir)
-	
+def blacklists(parser):
+	methodBl = [name for name in parser.methodBl if name != 'getCurrentCallbacks']
+	functionBl = ['linphone_vcard_get_belcard', 'linphone_core_get_current_vtable']
+	return (methodBl, functionBl, list(parser.classBl))
+
+def generator_files():
+	directory = os.path.dirname(os.path.abspath(__file__))
+	return [os.path.join(directory, 'genwrapper.py')] + sorted(glob.glob(os.path.join(directory, '*.mustache')))
+
+def parse_api(xmldir, jobs=1, docs=True, cacheDir=None):
 	project = CApi.Project()
-	project.initFromDir(args.xmldir)
+	project.jobs = jobs
+	project.cacheDir = cacheDir
+	project.initFromDirOrSnapshot(xmldir)
 	project.check()
 	
 	parser = AbsApi.CParser(project)
-	parser.functionBl = ['linphone_vcard_get_belcard', 'linphone_core_get_current_vtable']
-	parser.classBl += 'LinphoneCoreVTable'
-	parser.methodBl.remove('getCurrentCallbacks')
+	parser.methodBl, parser.functionBl, parser.classBl = blacklists(parser)
+	parser.jobs = jobs
+	parser.docs = docs
+	if cacheDir is not None:
+		parser.cacheFile = os.path.join(cacheDir, 'csharp-classes.pickle')
+		parser.cacheDependencies = generator_files()
 	parser.parse_all()
-	translator = CsharpTranslator()
-	renderer = pystache.Renderer()
-	
-	enums = []
-	for item in parser.enumsIndex.items():
-		if item[1] is not None:
-			impl = EnumImpl(item[1], translator)
-			enums.append(impl)
-		else:
-			print('warning: {0} enum won\'t be translated because of parsing errors'.format(item[0]))
+	return parser
 
-	interfaces = []
-	classes = []
-	for _class in parser.classesIndex.values() + parser.interfacesIndex.values():
-		if _class is not None:
-			try:
-				if type(_class) is AbsApi.Class:
-					impl = ClassImpl(_class, translator)
-					classes.append(impl)
-				else:
-					impl = InterfaceImpl(_class, translator)
-					interfaces.append(impl)
-			except AbsApi.Error as e:
-				print('Could not translate {0}: {1}'.format(_class.name.to_camel_case(fullName=True), e.args[0]))
+def translate_class(_class, translator):
+	try:
+		if type(_class) is AbsApi.Class:
+			return ClassImpl(_class, translator)
+		else:
+			return InterfaceImpl(_class, translator)
+	except AbsApi.Error as e:
+		logger.error('Could not translate {0}: {1}'.format(_class.name.to_camel_case(fullName=True), e.args[0]))
+		return None
 
+def translate_in_parallel(parser, items, jobs):
+	# Do not let the workers inherit pending messages
+	diagnostics.flush()
+	verbose = logger.isEnabledFor(logging.DEBUG)
+	pool = multiprocessing.Pool(min(jobs, len(items)), _init_translating_worker, (parser, items, verbose))
+	try:
+		results = pool.map(_translate_in_worker, list(range(len(items))), max(1, len(items) // (jobs * 4)))
+	finally:
+		pool.close()
+		pool.join()
+	
+	impls = []
+	for impl, records, unresolvedReferences in results:
+		diagnostics.replay(records)
+		for cname in unresolvedReferences:
+			parser.unresolvedReferences[cname] = None
+		impls.append(impl)
+	return impls
+
+_workerParser = None
+_workerItems = None
+_workerTranslator = None
+
+def _init_translating_worker(parser, items, verbose):
+	global _workerParser, _workerItems, _workerTranslator
+	diagnostics.setup_worker(verbose)
+	_workerParser = parser
+	_workerItems = items
+	_workerTranslator = CsharpTranslator(parser)
+
+# The translated views are sent back to the main process, which renders the
+# whole wrapper
+def _translate_in_worker(index):
+	impl = translate_class(_workerItems[index], _workerTranslator)
+	unresolvedReferences = list(_workerParser.unresolvedReferences.keys())
+	_workerParser.unresolvedReferences.clear()
+	return (impl, diagnostics.take_records(), unresolvedReferences)
+
+def generate(parser, outputdir, outputfile, jobs=1):
+	translator = CsharpTranslator(parser)
+	renderer = pystache.Renderer()
+	
+	with profiling.phase('translation'):
+		enums = []
+		for item in parser.enumsIndex.items():
+			if item[1] is not None:
+				impl = EnumImpl(item[1], translator)
+				enums.append(impl)
+			else:
+				logger.warning('warning: {0} enum won\'t be translated because of parsing errors'.format(item[0]))
+
+	# Interfaces and classes are split after the translation, so that they
+	# keep the order of the indexes whatever the way they are translated
+	items = [_class for _class in parser.classesIndex.values() + parser.interfacesIndex.values() if _class is not None]
+	if jobs > 1 and len(items) > 1:
+		with profiling.phase('parallel translation'):
+			impls = translate_in_parallel(parser, items, jobs)
+	else:
+		with profiling.phase('translation'):
+			impls = [translate_class(_class, translator) for _class in items]
+	interfaces = [impl for impl in impls if type(impl) is InterfaceImpl]
+	classes = [impl for impl in impls if type(impl) is ClassImpl]
+
+	parser.report_unresolved_references()
 	wrapper = WrapperImpl(enums, interfaces, classes)
-	render(renderer, wrapper, args.outputdir + "/" + args.outputfile)
+	outputs = manifest.Manifest(outputdir)
+	render(renderer, wrapper, outputdir + "/" + outputfile, outputs)
+	outputs.save()
+	parser.save_cache()
+
+def main():
+	argparser = argparse.ArgumentParser(description='Generate source files for the C++ wrapper')
+	argparser.add_argument('xmldir', type=str, help='Directory where the XML documentation of the Linphone\'s API generated by Doxygen is placed, or snapshot of the API saved by genapixml.py --snapshot')
+	argparser.add_argument('-o --output', type=str, help='the directory where to generate the source files', dest='outputdir', default='.')
+	argparser.add_argument('-n --name', type=str, help='the name of the genarated source file', dest='outputfile', default='LinphoneWrapper.cs')
+	argparser.add_argument('--profile-json', type=str, help='write the time and memory used by each phase of the generation to a JSON file', dest='profileJson')
+	argparser.add_argument('-j', '--jobs', type=int, help='number of processes used to parse and to translate the API', dest='jobs', default=1)
+	argparser.add_argument('--no-docs', action='store_true', help='do not generate the documentation of the API, which is faster', dest='noDocs')
+	argparser.add_argument('--cache-dir', type=str, help='directory where the parsing of the API is cached, so that only the modified parts are parsed and generated again', dest='cacheDir')
+	args = argparser.parse_args()
+	diagnostics.setup()
+	if args.profileJson is not None:
+		profiling.profiler.start_tracing()
+	
+	parser = parse_api(args.xmldir, jobs=args.jobs, docs=not args.noDocs, cacheDir=args.cacheDir)
+	generate(parser, args.outputdir, args.outputfile, jobs=args.jobs)
+	if args.profileJson is not None:
+		profiling.profiler.dump(args.profileJson, diagnostics=diagnostics.summary())
 
 if __name__ == '__main__':
-	main()
\ No newline at end of file
+	main()
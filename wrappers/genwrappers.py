@@ -0,0 +1,220 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+# Generate the C++, C# and Python wrappers from a single parsing of the API. The
+# XML directory is parsed once, then each generator renders the same model,
+# one after the other or in worker processes. A generator whose blacklists
+# differ from the default ones gets a restricted view of the parsed API, see
+# CParser.restricted().
+
+import argparse
+import collections
+import logging
+import multiprocessing
+import os
+import sys
+
+WRAPPERS_DIR = os.path.dirname(os.path.abspath(__file__))
+TOOLS_DIR = os.path.join(WRAPPERS_DIR, '..', 'tools')
+PYTHON_DIR = os.path.join(TOOLS_DIR, 'python')
+
+sys.path.insert(0, TOOLS_DIR)
+import genapixml as CApi
+import abstractapi as AbsApi
+import diagnostics
+import profiling
+
+logger = diagnostics.get_logger('genwrappers')
+
+TARGETS = ['cpp', 'csharp', 'python']
+
+
+def load_generator(name, path):
+	# The C++ and C# generators are both named genwrapper, they cannot be imported as usual
+	try:
+		import importlib.util
+		spec = importlib.util.spec_from_file_location(name, path)
+		module = importlib.util.module_from_spec(spec)
+		spec.loader.exec_module(module)
+		return module
+	except ImportError:
+		import imp
+		return imp.load_source(name, path)
+
+
+_generators = {}
+
+def generator(target):
+	module = _generators.get(target)
+	if module is None:
+		if target == 'python':
+			# apixml2python imports its own package, next to it
+			if PYTHON_DIR not in sys.path:
+				sys.path.insert(0, PYTHON_DIR)
+			module = load_generator('python_apixml2python', os.path.join(PYTHON_DIR, 'apixml2python.py'))
+		else:
+			module = load_generator(target + '_genwrapper', os.path.join(WRAPPERS_DIR, target, 'genwrapper.py'))
+		_generators[target] = module
+	return module
+
+
+class WrappersGenerator(object):
+	def __init__(self, project, targets, outputdir):
+		self.project = project
+		self.targets = targets
+		self.outputdir = os.path.abspath(outputdir)
+		self.jobs = 1
+		self.docs = True
+		self.trace = True
+		self.cacheDir = None
+		self.parser = None
+		self.targetParsers = {}
+
+	def parse(self):
+		parser = AbsApi.CParser(self.project)
+		blacklists = collections.OrderedDict()
+		for target in self.targets:
+			if target != 'python':
+				blacklists[target] = generator(target).blacklists(parser)
+		# The Python wrapper is generated from the XML description of the API
+		if len(blacklists) == 0:
+			return
+
+		# The shared parsing keeps what any of the generators wraps, each one
+		# then gets a parser restricted to its own blacklists
+		parser.methodBl, parser.functionBl, parser.classBl = [
+			[name for name in lists[0] if all(name in other for other in lists[1:])]
+			for lists in zip(*blacklists.values())
+		]
+		parser.jobs = self.jobs
+		parser.docs = self.docs
+		if self.cacheDir is not None:
+			parser.cacheFile = os.path.join(self.cacheDir, 'genwrappers-classes.pickle')
+			for target in blacklists.keys():
+				parser.cacheDependencies += generator(target).generator_files()
+		parser.parse_all()
+		self.parser = parser
+
+		with profiling.phase('blacklisting'):
+			for target, (methodBl, functionBl, classBl) in blacklists.items():
+				self.targetParsers[target] = parser.restricted(methodBl, functionBl, classBl)
+
+	def generate(self, target):
+		outputdir = os.path.join(self.outputdir, target)
+		if not os.path.isdir(outputdir):
+			os.makedirs(outputdir)
+		module = generator(target)
+		if target == 'cpp':
+			module.generate(self.targetParsers[target], outputdir, jobs=self.jobs)
+		elif target == 'csharp':
+			module.generate(self.targetParsers[target], outputdir, 'LinphoneWrapper.cs', jobs=self.jobs)
+		else:
+			self._generate_python(module, outputdir)
+
+	def _generate_python(self, module, outputdir):
+		apixmlfile = os.path.join(outputdir, 'api.xml')
+		with open(apixmlfile, 'w') as f:
+			CApi.Generator(f).generate(self.project)
+		# apixml2python looks for its templates relatively to the working directory
+		cwd = os.getcwd()
+		os.chdir(PYTHON_DIR)
+		try:
+			with open(os.path.join(outputdir, 'linphone.c'), 'w') as f:
+				module.generate(apixmlfile, f, trace=self.trace)
+		finally:
+			os.chdir(cwd)
+
+	def generate_all(self, processes=1):
+		if processes > 1 and len(self.targets) > 1:
+			self._generate_in_parallel(processes)
+		else:
+			for target in self.targets:
+				self.generate(target)
+		# Saved once all the wrappers have been generated from the parsing
+		if self.parser is not None:
+			self.parser.save_cache()
+
+	def _generate_in_parallel(self, processes):
+		# Do not let the workers inherit pending messages
+		diagnostics.flush()
+		verbose = logger.isEnabledFor(logging.DEBUG)
+		pool = multiprocessing.Pool(min(processes, len(self.targets)), _init_generating_worker, (self, verbose))
+		try:
+			results = pool.map(_generate_in_worker, self.targets, 1)
+		finally:
+			pool.close()
+			pool.join()
+
+		# Messages in the order of the targets, as in a serial run
+		for records in results:
+			diagnostics.replay(records)
+
+
+_workerGenerator = None
+
+def _init_generating_worker(wrappersGenerator, verbose):
+	global _workerGenerator
+	diagnostics.setup_worker(verbose)
+	# Daemonic processes cannot have their own pool of workers
+	wrappersGenerator.jobs = 1
+	_workerGenerator = wrappersGenerator
+
+def _generate_in_worker(target):
+	_workerGenerator.generate(target)
+	return diagnostics.take_records()
+
+
+def main(argv = None):
+	argparser = argparse.ArgumentParser(description='Generate the C++, C# and Python wrappers of the Linphone API from a single parsing of the API')
+	argparser.add_argument('xmldir', type=str, help='Directory where the XML documentation of the Linphone\'s API generated by Doxygen is placed, or snapshot of the API saved by genapixml.py --snapshot')
+	argparser.add_argument('-o', '--output', type=str, help='the directory where to generate the wrappers, in one sub-directory per language', dest='outputdir', default='.')
+	argparser.add_argument('-t', '--targets', nargs='+', choices=TARGETS, help='the wrappers to generate (default: all)', dest='targets', default=TARGETS)
+	argparser.add_argument('-j', '--jobs', type=int, help='number of processes used to parse the API and to translate or render each wrapper', dest='jobs', default=1)
+	argparser.add_argument('-p', '--processes', type=int, help='number of processes used to generate the wrappers, one wrapper per process', dest='processes', default=1)
+	argparser.add_argument('--no-docs', action='store_true', help='do not generate the documentation of the C++ and C# wrappers, which is faster', dest='noDocs')
+	argparser.add_argument('--no-trace', action='store_true', help='do not generate the calls tracing the functions of the Python wrapper', dest='noTrace')
+	argparser.add_argument('--cache-dir', type=str, help='directory where the parsing of the API is cached, so that only the modified parts are parsed and generated again', dest='cacheDir')
+	argparser.add_argument('--verbose', action='store_true', help='increase output verbosity', dest='verbose')
+	argparser.add_argument('--profile-json', type=str, help='write the time and memory used by each phase of the generation to a JSON file', dest='profileJson')
+	args = argparser.parse_args(argv)
+	diagnostics.setup(verbose=args.verbose)
+	if args.profileJson is not None:
+		args.profileJson = os.path.abspath(args.profileJson)
+		profiling.profiler.start_tracing()
+
+	targets = [target for target in TARGETS if target in args.targets]
+	project = CApi.Project()
+	project.jobs = args.jobs
+	project.cacheDir = args.cacheDir
+	project.initFromDirOrSnapshot(args.xmldir)
+	project.check()
+
+	wrappersGenerator = WrappersGenerator(project, targets, args.outputdir)
+	wrappersGenerator.jobs = args.jobs
+	wrappersGenerator.docs = not args.noDocs
+	wrappersGenerator.trace = not args.noTrace
+	wrappersGenerator.cacheDir = args.cacheDir
+	wrappersGenerator.parse()
+	wrappersGenerator.generate_all(processes=args.processes)
+	if args.profileJson is not None:
+		profiling.profiler.dump(args.profileJson, diagnostics=diagnostics.summary())
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
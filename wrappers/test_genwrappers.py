@@ -0,0 +1,152 @@
+#!/usr/bin/python
+
+# Copyright (C) 2017 Belledonne Communications SARL
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+# Check that genwrappers.py generates the same C++ and C# wrappers as the
+# generators run on their own, and that the wrappers generated again from a
+# cache are the same as the ones generated from scratch. Run with
+# python -m unittest from this directory.
+# The C# generator only runs with Python 2.
+
+import filecmp
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+
+import genwrappers
+
+sys.path.insert(0, os.path.join(genwrappers.TOOLS_DIR, 'benchmarks'))
+import doxygen_synth
+import diagnostics
+
+
+class MessageCollector(logging.Handler):
+	def __init__(self):
+		logging.Handler.__init__(self)
+		self.messages = []
+
+	def emit(self, record):
+		self.messages.append(record.getMessage())
+
+
+def write_api(xmldir):
+	size = doxygen_synth.ApiSize(classes=2, methods=2, properties=1, callbacks=1, enums=1, paragraphs=1)
+	doxygen_synth.generate(xmldir, size)
+	# The C++ wrapper blacklists getCurrentCallbacks methods, the C# one does not
+	root = ET.Element('doxygen')
+	compounddef = ET.SubElement(root, 'compounddef', {'kind': 'group', 'id': 'group__synth0_extras'})
+	ET.SubElement(compounddef, 'compoundname').text = 'synth0_extras'
+	functions = ET.SubElement(compounddef, 'sectiondef', {'kind': 'func'})
+	this = 'LinphoneSynth0 *'
+	doxygen_synth.add_function(functions, 'linphone_synth0_get_current_callbacks', 'LinphoneSynth0Cbs *', [('const ' + this, 'obj')],
+		'Get the callbacks being notified.', returnDoc='The callbacks')
+	doxygen_synth.add_function(functions, 'linphone_synth0_notify', 'void', [(this, 'obj')],
+		'Notify the callbacks returned by ', briefRefs=['linphone_synth0_get_current_callbacks()'])
+	doxygen_synth.write_xml(root, os.path.join(xmldir, 'group__synth0_extras.xml'))
+
+
+def remove_functions(xmldir, group, names):
+	path = os.path.join(xmldir, 'group__' + group + '.xml')
+	tree = ET.parse(path)
+	for section in tree.iter('sectiondef'):
+		for memberdef in section.findall('memberdef'):
+			if memberdef.get('id') in names:
+				section.remove(memberdef)
+	tree.write(path)
+
+
+class WrappersGeneratorTestCase(unittest.TestCase):
+	def setUp(self):
+		try:
+			genwrappers.generator('csharp')
+		except SyntaxError:
+			self.skipTest('the C# generator cannot be loaded with this version of Python')
+		self.workdir = tempfile.mkdtemp()
+		self.xmldir = os.path.join(self.workdir, 'xml')
+		write_api(self.xmldir)
+		self.logger = logging.getLogger(diagnostics.ROOT_LOGGER_NAME)
+		self.collector = MessageCollector()
+		self.logger.addHandler(self.collector)
+
+	def tearDown(self):
+		self.logger.removeHandler(self.collector)
+		shutil.rmtree(self.workdir)
+
+	def take_reference_messages(self):
+		messages = [message for message in self.collector.messages if 'reference' in message]
+		self.collector.messages = []
+		return messages
+
+	def generate_with_driver(self, outputdir, cacheDir=None):
+		project = genwrappers.CApi.Project()
+		project.cacheDir = cacheDir
+		project.initFromDir(self.xmldir)
+		wrappersGenerator = genwrappers.WrappersGenerator(project, ['cpp', 'csharp'], outputdir)
+		wrappersGenerator.cacheDir = cacheDir
+		wrappersGenerator.parse()
+		wrappersGenerator.generate_all()
+
+	def generate_standalone(self, outputdir, cacheDir=None):
+		for target, args in [('cpp', []), ('csharp', ['LinphoneWrapper.cs'])]:
+			module = genwrappers.generator(target)
+			targetdir = os.path.join(outputdir, target)
+			if not os.path.isdir(targetdir):
+				os.makedirs(targetdir)
+			module.generate(module.parse_api(self.xmldir, cacheDir=cacheDir), targetdir, *args)
+
+	def assert_same_files(self, dir1, dir2):
+		comparison = filecmp.dircmp(dir1, dir2, ignore=['.genwrapper-manifest.json'])
+		self.assertEqual(comparison.left_only + comparison.right_only, [], dir2)
+		mismatch = filecmp.cmpfiles(dir1, dir2, comparison.common_files, shallow=False)[1]
+		self.assertEqual(mismatch, [], dir2)
+		for subdir in comparison.common_dirs:
+			self.assert_same_files(os.path.join(dir1, subdir), os.path.join(dir2, subdir))
+
+	def test_reference_blacklisted_for_one_target(self):
+		standaloneDir = os.path.join(self.workdir, 'standalone')
+		self.generate_standalone(standaloneDir)
+		standaloneMessages = self.take_reference_messages()
+		driverDir = os.path.join(self.workdir, 'driver')
+		self.generate_with_driver(driverDir)
+		driverMessages = self.take_reference_messages()
+
+		# The reference is unknown to the C++ wrapper only
+		self.assertTrue(any('linphone_synth0_get_current_callbacks' in message for message in standaloneMessages))
+		self.assertEqual(driverMessages, standaloneMessages)
+		self.assert_same_files(standaloneDir, driverDir)
+
+	def test_incremental_generation(self):
+		for generate in [self.generate_standalone, self.generate_with_driver]:
+			cacheDir = os.path.join(self.workdir, generate.__name__ + '_cache')
+			outputDir = os.path.join(self.workdir, generate.__name__)
+			generate(outputDir, cacheDir=cacheDir)
+			# LinphoneSynth1 refers to LinphoneSynth0, which the C++ parser of
+			# genwrappers.py copies as it drops its currentCallbacks property
+			remove_functions(self.xmldir, 'synth0', ['linphone_synth0_ref', 'linphone_synth0_unref'])
+			generate(outputDir, cacheDir=cacheDir)
+			fullDir = os.path.join(self.workdir, generate.__name__ + '_full')
+			generate(fullDir)
+			self.assert_same_files(fullDir, outputDir)
+			write_api(self.xmldir)
+
+
+if __name__ == '__main__':
+	unittest.main()